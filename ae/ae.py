@@ -1,86 +1,481 @@
-import anthropic
 import urllib.parse
 import logging
 import json
-import itertools
 import threading
 import time
-import sys
 import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from typing import List, Dict
+from rich.progress import Progress, BarColumn, MofNCompleteColumn, TextColumn, TimeElapsedColumn
+from .rate_limiter import RateLimiter
+from .token_counter import TokenCounter, content_hash
+from .chunk_planner import ChunkPlanner, ChunkPlan
+from .streaming import JsonLinesParser, goal_number
+from .retry import AdaptiveConcurrencyLimiter, RetryPolicy
+from .jobs import JobStore
+from .telemetry import estimate_cost
+from .llm_client import shared_client
+from .qa_session import QASession
+from .transcript_store import TranscriptStore
+from ppe.compactor import TranscriptCompactor
+from .structured import (ANALYSIS_TOOL, META_ANALYSIS_TOOL, ResultValidator, StructuredOutputError,
+                         load_payload, response_text)
+
+# Bump these whenever the prompt wording or output format changes so stored
+# results are treated as stale and re-analyzed.
+ANALYSIS_PROMPT_VERSION = 4
+META_ANALYSIS_PROMPT_VERSION = 4
+# Retrieval selections kept per (transcript, goals); each is a short list of turn numbers
+SELECTION_CACHE_SIZE = 1024
+
+RESEARCHER_INSTRUCTIONS = (
+    "You are an expert qualitative researcher working with interview transcripts. "
+    "Base everything you say solely on the transcripts provided, avoid assumptions, "
+    "and quote the transcripts exactly when citing evidence."
+)
+
+class AnalysisError(Exception):
+    pass
+
+@contextmanager
+def worker_pool(max_workers):
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield executor
+    except BaseException:
+        # On errors and Ctrl+C, drop queued work instead of waiting for it
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
 
 class AnalysisEngine:
-    def __init__(self, data_manager, anthropic_api_key, anthropic_max_tokens):
+    def __init__(self, data_manager, anthropic_api_key, anthropic_max_tokens,
+                 anthropic_model='claude-3-5-sonnet-20241022', anthropic_temperature=0.7,
+                 max_workers=4, requests_per_minute=None, tokens_per_minute=None, client=None,
+                 response_cache=None, input_token_budget=150000, reduce_fanout=8, stream_responses=False,
+                 retry_policy=None, job_store=None, compactor=None, max_repair_attempts=2, retriever=None,
+                 telemetry=None, base_url=None, request_timeout=600.0, connect_timeout=10.0, max_connections=None,
+                 transcript_store=None):
         self.data_manager = data_manager
         self.anthropic_api_key = anthropic_api_key
         self.anthropic_max_tokens = anthropic_max_tokens
-        if anthropic_api_key:
-            self.client = anthropic.Client(api_key=anthropic_api_key)
-        else:
+        self.anthropic_model = anthropic_model
+        self.anthropic_temperature = anthropic_temperature
+        # Prompt size limit for transcript-heavy requests, independent of the output max_tokens
+        self.input_token_budget = input_token_budget
+        self.reduce_fanout = max(2, reduce_fanout)
+        self.stream_responses = stream_responses
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(self.max_workers)
+        # Follow-up requests sent when structured output fails validation
+        self.max_repair_attempts = max(0, max_repair_attempts)
+        self.repair_requests = 0
+        # Optional TranscriptCompactor applied to every transcript sent in a prompt
+        self.compactor = compactor
+        # Optional SegmentRetriever: analysis prompts then carry only goal-relevant turns
+        self.retriever = retriever
+        # Optional TelemetryLedger recording every LLM call
+        self.telemetry = telemetry
+        self.job_store = job_store or JobStore(os.path.join(os.getcwd(), "project_data"))
+        # Cached transcript reads, shared with the project manager when it creates the engine
+        self.transcript_store = transcript_store or TranscriptStore()
+        self.response_cache = response_cache
+        self.bypass_cache = False
+        self.usage_totals = {
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0
+        }
+        self._usage_lock = threading.Lock()
+        # The HTTP client is shared process-wide and only created on first use
+        self._client = client
+        self.base_url = base_url
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        # Streams hold a connection each, so every worker needs one (plus headroom for token counts)
+        self.max_connections = max_connections or self.max_workers + 2
+        if client is None and not anthropic_api_key:
             print("Warning: Anthropic API key not found in configuration.")
-            self.client = None
-        self.spinner_thread = None
-
-    def spinner(self):
-        spinner = itertools.cycle(['-', '/', '|', '\\'])
-        while getattr(self.spinner_thread, "do_run", True):
-            sys.stdout.write(next(spinner))
-            sys.stdout.flush()
-            sys.stdout.write('\b')
-            time.sleep(0.1)
-
-    def start_spinner(self):
-        self.spinner_thread = threading.Thread(target=self.spinner)
-        self.spinner_thread.daemon = True
-        self.spinner_thread.start()
-
-    def stop_spinner(self):
-        if self.spinner_thread:
-            self.spinner_thread.do_run = False
-            self.spinner_thread.join()
-            sys.stdout.write(' ')
-            sys.stdout.flush()
-
-    def analyze_interviews(self, project_name, argument):
+        self.token_counter = TokenCounter(
+            model=anthropic_model, client_provider=lambda: self.client, **data_manager.get_token_calibration()
+        )
+        self.last_stage_timings = {}
+        # Serializes DataManager writes from worker threads (streaming saves partial results)
+        self._data_lock = threading.Lock()
+        self._selections = OrderedDict()
+        self._selection_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None and self.anthropic_api_key:
+            self._client = shared_client(
+                self.anthropic_api_key,
+                base_url=self.base_url,
+                max_connections=self.max_connections,
+                timeout=self.request_timeout,
+                connect_timeout=self.connect_timeout
+            )
+        return self._client
+
+    def analyze_interviews(self, project_name, argument, force=False, stream=None):
+        stream = self.stream_responses if stream is None else stream
         learning_goals = self.data_manager.get_learning_goals(project_name)
         interviews = self.data_manager.get_interview_data(project_name, argument)
+        if not interviews:
+            print("No interviews to analyze.")
+            return
 
-        for interview in interviews:
-            print(f"Analyzing interview {interview['index']}... ", end="", flush=True)
-            self.start_spinner()
-            
-            vtt_filename = urllib.parse.unquote(interview['vtt_file'])
-            vtt_content = self.get_vtt_content(project_name, vtt_filename)
-            if vtt_content is None:
-                self.stop_spinner()
-                logging.error(f"Unable to analyze interview {interview['index']}: VTT file not found or unreadable")
-                continue
-            analysis_results = self.analyze_single_interview(vtt_content, learning_goals)
-            self.data_manager.save_analysis_results(project_name, interview['index'], analysis_results)
-            
-            self.stop_spinner()
-            print(f"Analysis completed for interview {interview['index']}")
+        if not force:
+            stale_interviews = [interview for interview in interviews if self._needs_analysis(project_name, interview, learning_goals)]
+            skipped = len(interviews) - len(stale_interviews)
+            if skipped:
+                print(f"Skipping {skipped} unchanged interview(s). Use --force to re-analyze them.")
+            interviews = stale_interviews
+            if not interviews:
+                print("All interviews are up to date.")
+                return
 
-    def get_vtt_content(self, project_name, vtt_filename):
-        project_dir = os.path.join(os.getcwd(), "project_data", project_name)
-        vtt_dir = os.path.join(project_dir, "vtt")
-        vtt_filename = urllib.parse.unquote(vtt_filename)
-        vtt_path = os.path.join(vtt_dir, vtt_filename)
+        job = self.job_store.create(
+            project_name, 'analysis',
+            {'argument': str(argument), 'force': force, 'stream': stream},
+            [self._interview_unit(interview) for interview in interviews]
+        )
+        self._run_analysis_job(project_name, job, interviews, learning_goals, stream)
+
+    def _interview_unit(self, interview):
+        return f"interview:{interview['index']}"
+
+    def _interview_scope(self, interview):
+        return dict(self._telemetry_fields(), stage='analysis', unit=self._interview_unit(interview))
+
+    @contextmanager
+    def _telemetry_scope(self, **fields):
+        if self.telemetry is None:
+            yield
+        else:
+            with self.telemetry.scoped(**fields):
+                yield
+
+    def _telemetry_fields(self):
+        return self.telemetry.scope() if self.telemetry else {}
+
+    def _in_scope(self, fields, fn, *args):
+        # Worker threads start without the submitting thread's telemetry scope
+        with self._telemetry_scope(**fields):
+            return fn(*args)
+
+    def _run_analysis_job(self, project_name, job, interviews, learning_goals, stream):
+        failures = 0
+        progress = self._progress()
         try:
-            with open(vtt_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except FileNotFoundError:
-            logging.error(f"VTT file not found: {vtt_path}")
+            with progress, worker_pool(self.max_workers) as executor, self._telemetry_scope(project=project_name, run=job.id):
+                task = progress.add_task("Analyzing interviews", total=len(interviews))
+                if stream:
+                    futures = {
+                        executor.submit(
+                            self._in_scope, self._interview_scope(interview),
+                            self._stream_interview, project_name, interview, learning_goals, progress
+                        ): interview
+                        for interview in interviews
+                    }
+                else:
+                    futures = {
+                        executor.submit(
+                            self._in_scope, self._interview_scope(interview),
+                            self._analyze_interview, project_name, interview, learning_goals
+                        ): interview
+                        for interview in interviews
+                    }
+                for future in as_completed(futures):
+                    interview = futures[future]
+                    try:
+                        analysis = future.result()
+                    except Exception as e:
+                        logging.error(f"Unable to analyze interview {interview['index']}: {str(e)}")
+                        analysis = None
+                    if analysis is not None:
+                        analysis_results, fingerprint = analysis
+                        with self._data_lock:
+                            self.data_manager.save_analysis_results(project_name, interview['index'], analysis_results, fingerprint)
+                        job.mark_finished(self._interview_unit(interview))
+                        progress.console.print(f"Analysis completed for interview {interview['index']}")
+                    else:
+                        failures += 1
+                    progress.advance(task)
+        except KeyboardInterrupt:
+            job.set_status('interrupted')
+            raise
+
+        if failures:
+            job.set_status('failed', f"{failures} interview(s) could not be analyzed")
+            print(f"{failures} interview(s) could not be analyzed. Run 'resume' to retry them.")
+        else:
+            job.set_status('completed')
+
+    def resume(self, project_name):
+        job = self.job_store.latest_unfinished(project_name)
+        if job is None:
+            print("No unfinished analysis jobs to resume.")
             return None
-        except Exception as e:
-            logging.error(f"Error reading VTT file {vtt_path}: {str(e)}")
+        finished, planned = job.progress()
+        print(f"Resuming {job.kind} job {job.id}: {finished} of {planned} unit(s) already finished.")
+        if job.kind == 'analysis':
+            remaining = set(job.unfinished_units())
+            interviews = [
+                interview for interview in self.data_manager.get_interview_data(project_name)
+                if self._interview_unit(interview) in remaining
+            ]
+            learning_goals = self.data_manager.get_learning_goals(project_name)
+            if not job.params.get('force'):
+                # Interviews brought up to date since the job stopped (by another analyze
+                # or a batch) are not sent again. A forced job re-analyzes them by design.
+                current = [interview for interview in interviews if not self._needs_analysis(project_name, interview, learning_goals)]
+                for interview in current:
+                    job.mark_finished(self._interview_unit(interview))
+                if current:
+                    print(f"Skipping {len(current)} interview(s) analyzed since the job stopped.")
+                interviews = [interview for interview in interviews if interview not in current]
+                if not interviews:
+                    job.set_status('completed')
+                    print("All interviews of this job are up to date.")
+                    return job
+            self._run_analysis_job(project_name, job, interviews, learning_goals, job.params.get('stream', self.stream_responses))
+        else:
+            self.perform_meta_analysis(project_name, job=job)
+        return job
+
+    def _progress(self):
+        return Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TimeElapsedColumn(),
+        )
+
+    def _analyze_interview(self, project_name, interview, learning_goals):
+        vtt_filename = urllib.parse.unquote(interview['vtt_file'])
+        vtt_content = self.get_vtt_content(project_name, vtt_filename)
+        if vtt_content is None:
+            logging.error(f"Unable to analyze interview {interview['index']}: VTT file not found or unreadable")
             return None
+        fingerprint = self.analysis_fingerprint(vtt_content, learning_goals)
+        return self.analyze_single_interview(vtt_content, learning_goals), fingerprint
+
+    def _stream_interview(self, project_name, interview, learning_goals, progress):
+        vtt_filename = urllib.parse.unquote(interview['vtt_file'])
+        vtt_content = self.get_vtt_content(project_name, vtt_filename)
+        if vtt_content is None:
+            logging.error(f"Unable to analyze interview {interview['index']}: VTT file not found or unreadable")
+            return None
+        fingerprint = self.analysis_fingerprint(vtt_content, learning_goals)
+
+        # Goals persisted by an interrupted run against the same inputs are kept
+        partial = interview.get('partial_analysis') or {}
+        completed = list(partial.get('results', [])) if partial.get('fingerprint') == fingerprint else []
+        finished_goals = {goal_number(result['learning_goal']) for result in completed}
+        remaining_goals = [goal for goal in learning_goals['preprocessed'] if goal['index'] not in finished_goals]
+        if completed:
+            progress.console.print(f"Interview {interview['index']}: resuming with {len(completed)} goal(s) already analyzed")
+
+        def on_result(result):
+            completed.append(result)
+            with self._data_lock:
+                self.data_manager.save_partial_analysis(project_name, interview['index'], {
+                    'fingerprint': fingerprint,
+                    'results': completed
+                })
+            progress.console.print(f"Interview {interview['index']} {result['learning_goal']}: {result['answer'][:100]}")
+
+        if remaining_goals:
+            self.analyze_single_interview_streaming(vtt_content, dict(learning_goals, preprocessed=remaining_goals), on_result)
+        completed.sort(key=lambda result: goal_number(result['learning_goal']) or 0)
+        return completed, fingerprint
+
+    def analysis_fingerprint(self, vtt_content, learning_goals):
+        return {
+            'transcript_hash': content_hash(vtt_content),
+            'learning_goals_hash': self._learning_goals_hash(learning_goals),
+            'prompt_version': ANALYSIS_PROMPT_VERSION,
+            'compaction': self.compactor.settings() if self.compactor else None,
+            'retrieval': self.retriever.settings() if self.retriever else None,
+            'model': self.anthropic_model
+        }
+
+    def _learning_goals_hash(self, learning_goals):
+        return content_hash(json.dumps(learning_goals.get('preprocessed', []), sort_keys=True))
+
+    def _needs_analysis(self, project_name, interview, learning_goals):
+        if not interview.get('analysis_results') or not interview.get('analysis_fingerprint'):
+            return True
+        vtt_content = self.get_vtt_content(project_name, interview['vtt_file'])
+        if vtt_content is None:
+            return True
+        return interview['analysis_fingerprint'] != self.analysis_fingerprint(vtt_content, learning_goals)
+
+    def get_vtt_content(self, project_name, vtt_filename):
+        return self.transcript_store.get(project_name, vtt_filename)
+
+    def prompt_transcript(self, vtt_content, speaker_aliases=None):
+        if not self.compactor:
+            return vtt_content
+        return self.compactor.compact(vtt_content, speaker_aliases).text
+
+    def goal_transcript(self, vtt_content, learning_goals, speaker_aliases=None):
+        # Transcript text for a prompt about the given goals: the turns retrieved
+        # for them when retrieval is enabled and trustworthy, else the whole transcript.
+        if not self.retriever:
+            return self.prompt_transcript(vtt_content, speaker_aliases)
+        transcript = self._segmenter().compact(vtt_content, speaker_aliases)
+        selected = self._retrieval_selection(vtt_content, transcript, learning_goals)
+        if selected is None:
+            return transcript.text if self.compactor else vtt_content
+        return "Excerpts relevant to the learning goals ('...' marks omitted parts of the conversation):\n\n" + transcript.excerpt(selected)
+
+    def _retrieval_selection(self, vtt_content, transcript, learning_goals):
+        # Meta-analysis asks for the same transcript while planning and again for every
+        # chunk part it renders, so the BM25 selection is computed once per transcript and goals
+        key = (content_hash(vtt_content), self._learning_goals_hash(learning_goals))
+        with self._selection_lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+        queries = [goal['content'] for goal in learning_goals.get('preprocessed', [])]
+        selected = self.retriever.select([turn.text for turn in transcript.turns], queries)
+        with self._selection_lock:
+            self._selections[key] = selected
+            while len(self._selections) > SELECTION_CACHE_SIZE:
+                self._selections.popitem(last=False)
+        return selected
+
+    def _segmenter(self):
+        # Speaker turns are the retrieval segments, compacted or not
+        return self.compactor or TranscriptCompactor(speaker_aliases=False, strip_fillers=False)
+
+    def resolve_evidence(self, results, vtt_content):
+        # Turn timestamps in a compacted or excerpted prompt are coarse; point evidence at the original cue
+        if not (self.compactor or self.retriever) or not vtt_content:
+            return results
+        transcript = self._segmenter().compact(vtt_content)
+        for result in results:
+            for evidence in result.get('evidence', []):
+                if evidence.get('quote') and evidence.get('timestamp', 'N/A') != 'N/A':
+                    evidence['timestamp'] = transcript.resolve_timestamp(evidence['timestamp'], evidence['quote'])
+        return results
+
+    def compaction_report(self, project_name, interviews, learning_goals):
+        # Raw counts persisted at import time (some measured by the API) are reused
+        self._seed_token_counts(interviews)
+        rows = []
+        for interview in interviews:
+            vtt_content = self.get_vtt_content(project_name, interview['vtt_file']) if interview.get('vtt_file') else None
+            if vtt_content is None:
+                continue
+            raw_tokens = self._estimate_token_count(vtt_content)
+            compacted_tokens = self._estimate_token_count(self.prompt_transcript(vtt_content))
+            prompt_tokens = self._estimate_token_count(self.goal_transcript(vtt_content, learning_goals))
+            rows.append({
+                'index': interview['index'],
+                'name': interview.get('name', 'Unnamed Interview'),
+                'raw_tokens': raw_tokens,
+                'compacted_tokens': compacted_tokens,
+                'prompt_tokens': prompt_tokens,
+                'saved_tokens': raw_tokens - prompt_tokens
+            })
+        return rows
 
     def analyze_single_interview(self, vtt_content, learning_goals):
         prompt = self.create_analysis_prompt(vtt_content, learning_goals)
-        response = self.submit_for_analysis(prompt)
-        parsed_results = self.parse_analysis_response(response)
-        return self._post_process_results(parsed_results)
+        results = self._request_structured(prompt, learning_goals['preprocessed'])
+        return self.resolve_evidence(self._post_process_results([result.to_dict() for result in results]), vtt_content)
+
+    def analyze_single_interview_streaming(self, vtt_content, learning_goals, on_result):
+        # Streamed responses are JSON lines, one learning goal per line, validated as each line completes
+        goals = learning_goals['preprocessed']
+        goals_by_index = {goal['index']: goal for goal in goals}
+        validator = ResultValidator()
+        problems = []
+        results = []
+
+        def parse_line(line):
+            try:
+                entry = load_payload(line)
+            except StructuredOutputError:
+                return []  # prose or code fences around the JSON lines
+            result = validator.validate_entry(entry, goals_by_index, problems, f"line for goal {entry.get('goal')}")
+            if result is None or any(previous['learning_goal'] == result.learning_goal for previous in results):
+                return []
+            return self.resolve_evidence(self._post_process_results([result.to_dict()]), vtt_content)
+
+        parser = JsonLinesParser(parse_line)
+
+        def emit(result):
+            results.append(result)
+            on_result(result)
+
+        def on_text(text):
+            for result in parser.feed(text):
+                emit(result)
+
+        if not self.client:
+            raise AnalysisError("Anthropic API key not configured.")
+        prompt = self.create_analysis_prompt(vtt_content, learning_goals, json_lines=True)
+        # Errors propagate so the caller keeps the goals persisted so far instead of saving a failure
+        self._create_message([{"role": "user", "content": prompt}], on_text=on_text)
+        for result in parser.close():
+            emit(result)
+
+        finished = {goal_number(result['learning_goal']) for result in results}
+        missing = [goal for goal in goals if goal['index'] not in finished]
+        if missing:
+            # Goals that were absent or invalid in the stream are requested again with tool use
+            logging.warning(f"Streamed analysis was missing valid results for {len(missing)} goal(s): {'; '.join(problems) or 'no output'}")
+            for result in self.analyze_single_interview(vtt_content, dict(learning_goals, preprocessed=missing)):
+                emit(result)
+        return results
+
+    def _request_structured(self, prompt, goals, meta=False, bypass_cache=False):
+        tool = META_ANALYSIS_TOOL if meta else ANALYSIS_TOOL
+        response = self.submit_for_analysis(prompt, bypass_cache, tool=tool)
+        return self.validate_structured_response(prompt, response, goals, meta)
+
+    def validate_structured_response(self, prompt, response, goals, meta=False):
+        # Parses and validates tool output; on failure the problems are sent back
+        # with the original prompt (whose prefix is cached) for a corrected answer.
+        tool = META_ANALYSIS_TOOL if meta else ANALYSIS_TOOL
+        validator = ResultValidator(meta)
+        request_prompt = prompt
+        for attempt in range(self.max_repair_attempts + 1):
+            try:
+                return validator.validate(load_payload(response), goals)
+            except StructuredOutputError as e:
+                error = e
+                # A response that failed validation must not be served from the cache again
+                if request_prompt is not None:
+                    self._discard_cached_response(request_prompt, tool)
+            if prompt is None or attempt == self.max_repair_attempts:
+                break
+            logging.warning(f"Structured output failed validation ({str(error)}); requesting a repair")
+            with self._usage_lock:
+                self.repair_requests += 1
+            request_prompt = self._repair_prompt(prompt, response, error, tool)
+            with self._telemetry_scope(repair=attempt + 1):
+                response = self.submit_for_analysis(request_prompt, tool=tool)
+        raise AnalysisError(f"Structured output failed validation: {str(error)}")
+
+    def _repair_prompt(self, prompt, response, error, tool):
+        blocks = [{"type": "text", "text": prompt}] if isinstance(prompt, str) else list(prompt)
+        problems = "\n".join(f"- {problem}" for problem in error.problems)
+        blocks.append({"type": "text", "text": (
+            f"A previous response to this request could not be used because of these problems:\n{problems}\n\n"
+            f"Previous response:\n{response}\n\n"
+            f"Call the {tool['name']} tool again with corrected input."
+        )})
+        return blocks
 
     def _post_process_results(self, results):
         for result in results:
@@ -96,9 +491,23 @@ class AnalysisEngine:
                 result['answer'] = 'Insufficient information to answer'
         return results
 
-    def create_analysis_prompt(self, vtt_content, learning_goals):
-        prompt = f"""
-        You are an expert qualitative researcher tasked with analyzing the following interview transcript. Your goal is to provide insightful, evidence-based answers to each learning goal question. Follow these guidelines strictly:
+    def _transcript_prefix(self, transcript_text, label="Interview Transcript"):
+        # Stable prefix shared by every request about the same transcript(s). The
+        # cache marker on the transcript block lets the provider reuse it across
+        # analysis, follow-up questions and refinements.
+        return [
+            {"type": "text", "text": RESEARCHER_INSTRUCTIONS},
+            {"type": "text", "text": f"{label}:\n{transcript_text}", "cache_control": {"type": "ephemeral"}},
+        ]
+
+    def create_analysis_prompt(self, vtt_content, learning_goals, json_lines=False):
+        if json_lines:
+            output_format = """Output exactly one line per learning goal, in order, and nothing else. Each line is a JSON object of this form:
+        {"goal": 1, "answer": "...", "evidence": [{"timestamp": "HH:MM:SS", "quote": "...", "explanation": "..."}], "confidence": "High|Medium|Low"}"""
+        else:
+            output_format = f"""Record your analysis by calling the {ANALYSIS_TOOL['name']} tool with one result per learning goal."""
+        request = f"""
+        Your goal is to provide insightful, evidence-based answers to each learning goal question about the interview transcript above. Follow these guidelines strictly:
 
         1. Analyze the interview transcript thoroughly.
         2. For each learning goal, provide a comprehensive answer based solely on the information in the transcript.
@@ -108,86 +517,113 @@ class AnalysisEngine:
         6. Avoid making assumptions or introducing information not present in the transcript.
         7. Be concise but thorough in your answers.
 
-        Interview Transcript:
-        {vtt_content}
-
         Learning Goals:
         {self.format_learning_goals(learning_goals)}
 
-        Provide your analysis in the following format for each learning goal:
-
-        [Learning Goal X: Title]
-        Answer: (Provide a comprehensive answer here, or state "Insufficient information to answer" if applicable)
-        Evidence:
-        - Timestamp: (HH:MM:SS)
-          Quote: "(Exact quote from the transcript)"
-          Explanation: (Brief explanation of how this quote supports your answer or why there isn't enough information)
-        Confidence: (High/Medium/Low - based on the amount and quality of supporting evidence)
-
-        Repeat this structure for each learning goal, ensuring that every goal has an answer, at least one piece of evidence, and a confidence rating.
+        {output_format} For each learning goal give its number, the answer (or "Insufficient information to answer"), at least one piece of evidence with its timestamp (HH:MM:SS), an exact quote from the transcript and a brief explanation, and a confidence of High, Medium or Low based on the amount and quality of supporting evidence.
         """
-        return prompt
+        return self._transcript_prefix(self.goal_transcript(vtt_content, learning_goals)) + [{"type": "text", "text": request}]
 
     def format_learning_goals(self, learning_goals):
-        return "\n".join([f"{i+1}. {goal['content']}" for i, goal in enumerate(learning_goals['preprocessed'])])
-
-    def parse_analysis_response(self, response):
-        parsed_results = []
-        current_goal = None
-        current_answer = {}
-
-        for line in response.split('\n'):
-            line = line.strip()
-            if line.startswith('[Learning Goal'):
-                if current_goal:
-                    self._finalize_current_answer(current_answer)
-                    parsed_results.append(current_answer)
-                current_goal = line
-                current_answer = {'learning_goal': current_goal, 'answer': '', 'evidence': [], 'confidence': ''}
-            elif line.startswith('Answer:'):
-                current_answer['answer'] = line.replace('Answer:', '').strip()
-            elif line.startswith('Evidence:'):
-                continue  # Skip this line, we'll collect evidence in the following lines
-            elif line.startswith('- Timestamp:'):
-                evidence = {'timestamp': line.replace('- Timestamp:', '').strip()}
-                current_answer['evidence'].append(evidence)
-            elif line.startswith('Quote:') and current_answer['evidence']:
-                current_answer['evidence'][-1]['quote'] = line.replace('Quote:', '').strip()
-            elif line.startswith('Explanation:') and current_answer['evidence']:
-                current_answer['evidence'][-1]['explanation'] = line.replace('Explanation:', '').strip()
-            elif line.startswith('Confidence:'):
-                current_answer['confidence'] = line.replace('Confidence:', '').strip()
-
-        if current_goal:  # Add the last goal
-            self._finalize_current_answer(current_answer)
-            parsed_results.append(current_answer)
-
-        return parsed_results
-
-    def perform_meta_analysis(self, project_name: str) -> List[Dict]:
-        print("Performing meta-analysis... ", end="", flush=True)
-        self.start_spinner()
-
-        project_data = self.data_manager.get_project_status(project_name)
+        return "\n".join([f"{goal['index']}. {goal['content']}" for goal in learning_goals['preprocessed']])
+
+    def perform_meta_analysis(self, project_name: str, job=None) -> List[Dict]:
         learning_goals = self.data_manager.get_learning_goals(project_name)
-        
         interviews = self.data_manager.get_interview_data(project_name)
-        
-        # Break analysis into chunks
-        chunk_results = self._analyze_in_chunks(project_name, interviews, learning_goals)
-        
-        # Combine chunk results
-        meta_analysis_results = self._combine_chunk_results(chunk_results, learning_goals)
-        
+
+        # Plan chunks up front so the number of LLM calls is known before any are made
+        plan = self.plan_meta_analysis(project_name, interviews, learning_goals)
+        goal_count = len(learning_goals.get('preprocessed', []))
+        synthesis_calls = goal_count * self._planned_synthesis_calls(plan.call_count)
+        print(f"Meta-analysis plan: {plan.call_count} chunk call(s) and about {synthesis_calls} synthesis call(s) "
+              f"with an input budget of {plan.input_token_budget} tokens per call.")
+        if plan.split_interviews:
+            print(f"Interviews split on speaker turns: {', '.join(str(index) for index in plan.split_interviews)}")
+
+        chunk_fingerprints = [self._chunk_fingerprint(chunk.digests, learning_goals) for chunk in plan.chunks]
+        chunk_units = [f"chunk:{fingerprint}" for fingerprint in chunk_fingerprints]
+        if job is None:
+            # A new run continues an unfinished one, so its finished chunks and
+            # syntheses are reused; both are keyed by content, not by position
+            job = self.job_store.latest_unfinished(project_name, 'meta_analysis')
+            if job is not None:
+                finished, _ = job.progress()
+                print(f"Continuing unfinished meta-analysis job {job.id} ({finished} unit(s) already finished).")
+        if job is None:
+            job = self.job_store.create(project_name, 'meta_analysis', {}, chunk_units)
+        else:
+            job.plan(chunk_units)
+
+        try:
+            with self._progress() as progress, self._telemetry_scope(project=project_name, run=job.id):
+                # Map stage: analyze chunks concurrently. It must finish before the
+                # reduce stage starts, since every goal needs every chunk's result.
+                started = time.perf_counter()
+                chunk_results = self._analyze_in_chunks(project_name, plan, chunk_fingerprints, learning_goals, progress, job)
+                map_seconds = time.perf_counter() - started
+
+                # Reduce stage: synthesize each learning goal concurrently
+                started = time.perf_counter()
+                meta_analysis_results = self._combine_chunk_results(chunk_results, learning_goals, progress, job)
+                reduce_seconds = time.perf_counter() - started
+        except KeyboardInterrupt:
+            job.set_status('interrupted')
+            raise
+        except Exception as e:
+            job.set_status('failed', str(e))
+            raise
+
+        self.last_stage_timings = {'map': map_seconds, 'reduce': reduce_seconds}
+        logging.info(f"Meta-analysis stage timings: {self.last_stage_timings}")
+        print(f"Map stage: {plan.call_count} chunk(s) in {map_seconds:.1f}s. "
+              f"Reduce stage: {goal_count} goal(s) in {reduce_seconds:.1f}s.")
+
         self.data_manager.save_meta_analysis_results(project_name, meta_analysis_results)
-        
-        self.stop_spinner()
+        job.set_status('completed')
         print("Meta-analysis completed!")
         return meta_analysis_results
 
-    def _get_all_transcripts(self, project_name: str) -> str:
-        interviews = self.data_manager.get_interview_data(project_name)
-        return "\n\n".join([self.get_vtt_content(project_name, interview['vtt_file']) for interview in interviews if 'vtt_file' in interview])
+    def plan_meta_analysis(self, project_name: str, interviews: List[Dict], learning_goals: Dict) -> ChunkPlan:
+        interviews_by_index = {interview['index']: interview for interview in interviews}
+
+        def reload(interview_index):
+            transcript = self._meta_transcript(project_name, interviews_by_index[interview_index], learning_goals)
+            if transcript is None:
+                raise AnalysisError(f"Transcript of interview {interview_index} is no longer readable.")
+            return transcript
+
+        empty_prompt = self._create_meta_analysis_prompt(learning_goals, "")
+        prompt_tokens = self._estimate_token_count(self._message_text({'content': empty_prompt}))
+        planner = ChunkPlanner(self.input_token_budget - prompt_tokens, self._estimate_token_count)
+        # Transcripts stream through the planner one at a time and are reloaded per chunk,
+        # so memory use depends on the chunk size rather than on the size of the project
+        return planner.plan(
+            self.iter_meta_transcripts(project_name, interviews, learning_goals), reload=reload,
+            previous=self._reusable_chunk_parts(project_name, learning_goals)
+        )
+
+    def _reusable_chunk_parts(self, project_name: str, learning_goals: Dict) -> List[List[str]]:
+        # Previous chunks are only worth keeping while their stored results are still valid
+        chunk_results = self.data_manager.get_meta_analysis_chunks(project_name)
+        return [
+            digests for fingerprint, digests in self.data_manager.get_meta_analysis_chunk_parts(project_name).items()
+            if fingerprint in chunk_results and self._chunk_fingerprint(digests, learning_goals) == fingerprint
+        ]
+
+    def iter_meta_transcripts(self, project_name: str, interviews: List[Dict], learning_goals: Dict):
+        for interview in interviews:
+            transcript = self._meta_transcript(project_name, interview, learning_goals)
+            if transcript is None:
+                logging.error(f"Skipping interview {interview['index']} in meta-analysis: VTT file not found or unreadable")
+                continue
+            yield interview['index'], transcript
+
+    def _meta_transcript(self, project_name: str, interview: Dict, learning_goals: Dict):
+        transcript = self.get_vtt_content(project_name, interview['vtt_file']) if interview.get('vtt_file') else None
+        if transcript is None:
+            return None
+        # Full speaker names are kept: aliases would be ambiguous across interviews
+        return self.goal_transcript(transcript, learning_goals, speaker_aliases=False)
 
     def _get_analyzable_interviews(self, interviews: List[Dict], project_name: str) -> List[Dict]:
         analyzable_interviews = []
@@ -195,84 +631,180 @@ class AnalysisEngine:
         for interview in interviews:
             interview_transcript = self.get_vtt_content(project_name, interview['vtt_file'])
             interview_tokens = self._estimate_token_count(interview_transcript)
-            if current_tokens + interview_tokens <= self.anthropic_max_tokens:
+            if current_tokens + interview_tokens <= self.input_token_budget:
                 analyzable_interviews.append(interview)
                 current_tokens += interview_tokens
             else:
                 break
         return analyzable_interviews
 
-    def _get_transcripts_for_interviews(self, project_name: str, interviews: List[Dict]) -> str:
-        return "\n\n".join([self.get_vtt_content(project_name, interview['vtt_file']) for interview in interviews if 'vtt_file' in interview])
+    def _analyze_in_chunks(self, project_name: str, plan: ChunkPlan, chunk_fingerprints: List[str], learning_goals: Dict,
+                           progress=None, job=None) -> List[Dict]:
+        previous_chunks = self.data_manager.get_meta_analysis_chunks(project_name)
+        current_chunks = {}
+        task = progress.add_task("Analyzing chunks", total=plan.call_count) if progress else None
 
-    def _analyze_in_chunks(self, project_name: str, interviews: List[Dict], learning_goals: Dict) -> List[Dict]:
-        chunk_results = []
-        current_chunk = []
-        current_tokens = 0
+        with worker_pool(self.max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self._in_scope, dict(self._telemetry_fields(), stage='meta_chunk', unit=f"chunk:{fingerprint[:12]}"),
+                    self._analyze_planned_chunk, chunk, fingerprint, learning_goals, previous_chunks, job
+                )
+                for chunk, fingerprint in zip(plan.chunks, chunk_fingerprints)
+            ]
+            for future in as_completed(futures):
+                if progress:
+                    progress.advance(task)
+            chunk_results = [future.result() for future in futures]
 
-        for interview in interviews:
-            interview_transcript = self.get_vtt_content(project_name, interview['vtt_file'])
-            interview_tokens = self._estimate_token_count(interview_transcript)
-            
-            if current_tokens + interview_tokens > self.anthropic_max_tokens:
-                if current_chunk:
-                    chunk_results.append(self._analyze_chunk(current_chunk, learning_goals))
-                current_chunk = [interview_transcript]
-                current_tokens = interview_tokens
-            else:
-                current_chunk.append(interview_transcript)
-                current_tokens += interview_tokens
-        
-        if current_chunk:
-            chunk_results.append(self._analyze_chunk(current_chunk, learning_goals))
-        
+        chunk_parts = {}
+        for chunk, fingerprint, chunk_result in zip(plan.chunks, chunk_fingerprints, chunk_results):
+            if chunk_result:
+                current_chunks[fingerprint] = chunk_result
+                chunk_parts[fingerprint] = chunk.digests
+
+        # Only keep results for chunks that are still part of the project
+        self.data_manager.save_meta_analysis_chunks(project_name, current_chunks, chunk_parts)
         return chunk_results
 
-    def _analyze_chunk(self, chunk: List[str], learning_goals: Dict) -> Dict:
-        all_transcripts = "\n\n".join(chunk)
-        prompt = self._create_meta_analysis_prompt(learning_goals, all_transcripts)
-        response = self.submit_for_analysis(prompt)
-        return self.parse_meta_analysis_response(response)
-
-    def _combine_chunk_results(self, chunk_results: List[Dict], learning_goals: Dict) -> List[Dict]:
-        combined_results = []
-        
-        for goal in learning_goals['preprocessed']:
-            goal_results = []
-            for chunk in chunk_results:
-                for result in chunk:
-                    if result['learning_goal'] == f"[Learning Goal {goal['index']}]":
-                        goal_results.append(result)
-            
-            combined_result = self._synthesize_goal_results(goal, goal_results)
-            combined_results.append(combined_result)
-        
-        return combined_results
+    def _chunk_fingerprint(self, transcript_hashes: List[str], learning_goals: Dict) -> str:
+        return content_hash(json.dumps({
+            'transcript_hashes': transcript_hashes,
+            'learning_goals_hash': self._learning_goals_hash(learning_goals),
+            'prompt_version': META_ANALYSIS_PROMPT_VERSION,
+            'model': self.anthropic_model
+        }, sort_keys=True))
 
-    def _synthesize_goal_results(self, goal: Dict, goal_results: List[Dict]) -> Dict:
-        prompt = f"""
-        Synthesize the following results for the learning goal: "{goal['content']}"
+    def _analyze_planned_chunk(self, chunk, fingerprint: str, learning_goals: Dict, previous_chunks: Dict, job=None):
+        unit = f"chunk:{fingerprint}"
+        if job and job.is_finished(unit):
+            return job.output(unit)
+        if fingerprint in previous_chunks:
+            chunk_result = previous_chunks[fingerprint]
+        else:
+            chunk_result = self._analyze_chunk(chunk.render(), learning_goals)
+        if job:
+            # Checkpoint immediately so an interrupted run never redoes this chunk
+            job.mark_finished(unit, chunk_result)
+        return chunk_result
+
+    def _analyze_chunk(self, chunk_text: str, learning_goals: Dict) -> Dict:
+        prompt = self._create_meta_analysis_prompt(learning_goals, chunk_text)
+        return [result.to_dict() for result in self._request_structured(prompt, learning_goals['preprocessed'], meta=True)]
+
+    def _combine_chunk_results(self, chunk_results: List[Dict], learning_goals: Dict, progress=None, job=None) -> List[Dict]:
+        goals = learning_goals['preprocessed']
+        pending = {}
+        for goal in goals:
+            label = f"[Learning Goal {goal['index']}]"
+            pending[goal['index']] = [result for chunk in chunk_results for result in chunk if result['learning_goal'] == label]
+
+        # Tree reduction: each level merges results in groups bounded by the fanout
+        # and the input budget, until every goal fits in one final synthesis.
+        combined = {}
+        level = 1
+        with worker_pool(self.max_workers) as executor:
+            while pending:
+                groups = {goal['index']: self._reduction_groups(goal, pending[goal['index']]) for goal in goals if goal['index'] in pending}
+                total = sum(len(goal_groups) for goal_groups in groups.values())
+                task = progress.add_task(f"Synthesizing goals (level {level})", total=total) if progress else None
+                futures = {
+                    goal['index']: [
+                        self._carried(group[0]) if len(group) == 1 and len(groups[goal['index']]) > 1 else
+                        executor.submit(
+                            self._in_scope,
+                            dict(self._telemetry_fields(), stage='meta_synthesis', unit=f"goal:{goal['index']}/level:{level}"),
+                            self._synthesize_checkpointed, goal, group, job
+                        )
+                        for group in groups[goal['index']]
+                    ]
+                    for goal in goals if goal['index'] in groups
+                }
+                for future in as_completed([future for goal_futures in futures.values() for future in goal_futures]):
+                    if progress:
+                        progress.advance(task)
+                next_pending = {}
+                for goal_index, goal_futures in futures.items():
+                    results = [future.result() for future in goal_futures]
+                    if len(results) == 1:
+                        combined[goal_index] = results[0]
+                    else:
+                        next_pending[goal_index] = results
+                pending = next_pending
+                level += 1
+
+        return [combined[goal['index']] for goal in goals]
+
+    def _carried(self, result: Dict) -> Future:
+        # A lone result is passed to the next level as is; synthesizing it on its
+        # own would cost a call and add a lossy pass without merging anything
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _synthesize_checkpointed(self, goal: Dict, goal_results: List[Dict], job=None) -> Dict:
+        if job is None:
+            return self._synthesize_goal_results(goal, goal_results)
+        # Keyed by content, so the same group of inputs is never synthesized twice
+        unit = "synthesis:" + content_hash(json.dumps({'goal': goal, 'results': goal_results}, sort_keys=True))
+        if job.is_finished(unit):
+            return job.output(unit)
+        job.plan([unit])
+        result = self._synthesize_goal_results(goal, goal_results)
+        job.mark_finished(unit, result)
+        return result
+
+    def _planned_synthesis_calls(self, chunk_count: int) -> int:
+        # Calls per goal if every level is limited by the fanout alone
+        calls = 0
+        remaining = max(1, chunk_count)
+        while True:
+            groups = -(-remaining // self.reduce_fanout)
+            if groups == 1:
+                return calls + 1
+            # Groups of a single result are carried to the next level without a call
+            single = groups - remaining % groups if remaining // groups == 1 else 0
+            calls += groups - single
+            remaining = groups
+
+    def _reduction_groups(self, goal: Dict, goal_results: List[Dict]) -> List[List[Dict]]:
+        budget = self.input_token_budget - self._estimate_token_count(self._synthesis_prompt(goal, []))
+        # Groups of even size, so 9 results with a fanout of 8 give 5 + 4 rather than 8 + 1
+        group_count = max(1, -(-len(goal_results) // self.reduce_fanout))
+        group_sizes = [len(goal_results) // group_count + (1 if number < len(goal_results) % group_count else 0)
+                       for number in range(group_count)]
+        groups = []
+        current = []
+        current_tokens = 0
+        for result in goal_results:
+            result_tokens = self._estimate_token_count(json.dumps(result, ensure_ascii=False))
+            # Every group takes at least two results so each level shrinks the tree
+            full = len(current) >= group_sizes[min(len(groups), group_count - 1)] or (len(current) >= 2 and current_tokens + result_tokens > budget)
+            if full:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(result)
+            current_tokens += result_tokens
+        if current or not groups:
+            groups.append(current)
+        return groups
+
+    def _synthesis_prompt(self, goal: Dict, goal_results: List[Dict]) -> str:
+        return f"""
+        Synthesize the following partial results for one learning goal into a single result.
 
         Results:
-        {json.dumps(goal_results, indent=2)}
-
-        Provide a synthesized answer that combines insights from all chunks, a confidence score (0-100) based on the consistency and quality of evidence across chunks, and the most relevant pieces of evidence.
-
-        Format your response as follows:
-        Answer: (Your synthesized answer)
-        Confidence: (0-100)
-        Evidence:
-        1. Quote: "(Most relevant quote)"
-           Context: (Interview context)
-           Explanation: (How this supports the answer)
-        2. (Second most relevant piece of evidence)
-        3. (Third most relevant piece of evidence)
+        {json.dumps(goal_results, ensure_ascii=False)}
+
+        Learning Goals:
+        {goal['index']}. {goal['content']}
+
+        Call the {META_ANALYSIS_TOOL['name']} tool with one result for this learning goal: a synthesized answer that combines insights from all partial results, a confidence score (0-100) based on the consistency and quality of evidence across them, and the three most relevant pieces of evidence, each with its quote, interview context and explanation.
         """
 
-        response = self.submit_for_analysis(prompt)
-        synthesized_result = self.parse_meta_analysis_response(response)[0]
-        synthesized_result['learning_goal'] = f"[Learning Goal {goal['index']}]"
-        return synthesized_result
+    def _synthesize_goal_results(self, goal: Dict, goal_results: List[Dict]) -> Dict:
+        # Validation guarantees exactly one result, for this goal
+        return self._request_structured(self._synthesis_prompt(goal, goal_results), [goal], meta=True)[0].to_dict()
 
     def calculate_interview_tokens(self, project_name: str, interview: Dict) -> int:
         vtt_filename = interview.get('vtt_file')
@@ -283,17 +815,22 @@ class AnalysisEngine:
         return 0
 
     def _estimate_token_count(self, text: str) -> int:
-        if self.client:
-            return self.client.count_tokens(text)
-        else:
-            # Fallback to rough estimation if client is not available
-            return len(text) // 4
+        # Offline, memoized by content hash; never calls the API
+        return self.token_counter.count(text)
+
+    def _estimate_request_tokens(self, text: str) -> int:
+        return self.token_counter.estimate(text)
+
+    def _seed_token_counts(self, interviews: List[Dict]):
+        # Reuse counts persisted with each interview by preprocess_and_save_interview.
+        # They are keyed by the raw transcript's hash, so only raw-text counts use them.
+        for interview in interviews:
+            if interview.get('transcript_hash') and interview.get('raw_tokens') is not None:
+                self.token_counter.seed(interview['transcript_hash'], interview['raw_tokens'])
 
     def _create_meta_analysis_prompt(self, learning_goals, all_transcripts):
         goals_text = self.format_learning_goals(learning_goals)
-        return f"""You are an expert qualitative researcher tasked with performing a comprehensive analysis of the provided interview transcripts. Your goal is to synthesize information from these transcripts to answer the following learning goals:
-
-        {goals_text}
+        request = f"""Your task is to perform a comprehensive analysis of the interview transcripts above. Your goal is to synthesize information from these transcripts to answer the learning goals listed below.
 
         Follow these guidelines to conduct a thorough and insightful analysis:
 
@@ -313,108 +850,204 @@ class AnalysisEngine:
         - Nuanced: Capture the complexity of the topics discussed
         - Well-supported: Provide clear links between your conclusions and the evidence
 
-        Here are the interview transcripts for this chunk:
+        Learning Goals:
+        {goals_text}
 
-        {all_transcripts}
+        Record your analysis by calling the {META_ANALYSIS_TOOL['name']} tool with one result per learning goal: its number, your comprehensive synthesis (or "Insufficient information to answer"), a confidence score from 0 to 100, and at least three pieces of evidence, each with a direct quote, its interview context and an explanation of how it supports your answer.
+        """
+        return self._transcript_prefix(all_transcripts, label="Interview Transcripts") + [{"type": "text", "text": request}]
 
-        Please provide your detailed analysis, structuring your response for each learning goal as follows:
+    def _cache_key(self, messages, tool=None):
+        extra = {'tools': [tool]} if tool else {}
+        return self.response_cache.make_key(
+            self.anthropic_model, self.anthropic_temperature, self.anthropic_max_tokens, messages, **extra
+        )
 
-        [Learning Goal X]
-        Answer: (Your comprehensive synthesis)
-        Confidence: (0-100)
-        Evidence:
-        1. Quote: "(Direct quote)"
-           Context: (Interview context)
-           Explanation: (How this supports your answer)
-        2. (Repeat for at least 3 pieces of evidence)
+    def _discard_cached_response(self, prompt, tool=None):
+        if self.response_cache:
+            self.response_cache.delete(self._cache_key([{"role": "user", "content": prompt}], tool))
 
-        Begin your analysis:
-        """
+    def _create_message(self, messages, bypass_cache=False, on_text=None, tool=None):
+        started = time.perf_counter()
+        cache_key = None
+        if self.response_cache and not (bypass_cache or self.bypass_cache):
+            cache_key = self._cache_key(messages, tool)
+            cached_response = self.response_cache.get(cache_key)
+            if cached_response is not None:
+                logging.debug("LLM response served from cache")
+                self._record_call('cached', started, streamed=bool(on_text))
+                if on_text:
+                    on_text(cached_response)
+                return cached_response
 
-    def parse_meta_analysis_response(self, response):
-        parsed_results = []
-        current_goal = None
-        current_answer = {}
-
-        for line in response.split('\n'):
-            line = line.strip()
-            if line.startswith('[Learning Goal'):
-                if current_goal:
-                    parsed_results.append(current_answer)
-                current_goal = line
-                current_answer = {'learning_goal': current_goal, 'answer': '', 'evidence': [], 'confidence': ''}
-            elif line.startswith('Answer:'):
-                current_answer['answer'] = line.replace('Answer:', '').strip()
-            elif line.startswith('Confidence:'):
-                current_answer['confidence'] = line.replace('Confidence:', '').strip()
-            elif line.startswith('Evidence:'):
-                continue  # Skip this line, we'll collect evidence in the following lines
-            elif line.startswith('- Quote:'):
-                evidence = {'quote': line.replace('- Quote:', '').strip()}
-                current_answer['evidence'].append(evidence)
-            elif line.startswith('Context:') and current_answer['evidence']:
-                current_answer['evidence'][-1]['context'] = line.replace('Context:', '').strip()
-
-        if current_goal:  # Add the last goal
-            parsed_results.append(current_answer)
-
-        return parsed_results
-
-    def _finalize_current_answer(self, answer):
-        if not answer['evidence']:
-            answer['evidence'] = [{
-                'timestamp': 'N/A',
-                'quote': 'No specific quote available',
-                'explanation': 'Insufficient information in the transcript to provide evidence.'
-            }]
-        if not answer['confidence']:
-            answer['confidence'] = 'Low'
-        if not answer['answer']:
-            answer['answer'] = 'Insufficient information to answer'
-
-    def submit_for_analysis(self, text):
-        if not self.client:
-            return "Analysis failed: Anthropic API key not configured."
+        request = {
+            'model': self.anthropic_model,
+            'messages': messages,
+            'max_tokens': self.anthropic_max_tokens,
+            'temperature': self.anthropic_temperature,
+        }
+        if tool:
+            request['tools'] = [tool]
+            request['tool_choice'] = {'type': 'tool', 'name': tool['name']}
+        request_tokens = self._estimate_request_tokens("\n".join(self._message_text(message) for message in messages))
+        streamed = []
+
+        def stream_text(text):
+            streamed.append(True)
+            on_text(text)
+
+        def send():
+            self.concurrency_limiter.acquire()
+            try:
+                self.rate_limiter.acquire(request_tokens)
+                if on_text:
+                    with self.client.messages.stream(**request) as stream:
+                        for text in stream.text_stream:
+                            stream_text(text)
+                        return stream.get_final_message()
+                return self.client.messages.create(**request)
+            finally:
+                self.concurrency_limiter.release()
+
+        # A stream that already produced output is not retried, since the text was consumed
+        retries = []
         try:
-            response = self.client.messages.create(
-                model=self.plm.anthropic_model,
-                messages=[{"role": "user", "content": text}],
-                max_tokens=self.plm.anthropic_max_tokens,
-                temperature=self.plm.anthropic_temperature,
+            response = self.retry_policy.call(
+                send, self.concurrency_limiter, can_retry=lambda: not streamed,
+                on_retry=lambda attempt, error: retries.append(error)
             )
-            raw_response = response.content[0].text
-            logging.debug(f"Raw LLM response: {raw_response}")
-            return raw_response
         except Exception as e:
+            self._record_call('error', started, retries=len(retries), streamed=bool(on_text), error=f"{type(e).__name__}: {str(e)}")
+            raise
+        self._record_usage(response)
+        self._record_call('ok', started, response, retries=len(retries), streamed=bool(on_text))
+        raw_response = response_text(response)
+        if self.response_cache:
+            if cache_key is None:
+                cache_key = self._cache_key(messages, tool)
+            # Bypassed calls still refresh the cache so the next run can reuse them
+            self.response_cache.set(cache_key, raw_response)
+        return raw_response
+
+    def _message_text(self, message):
+        content = message['content']
+        if isinstance(content, str):
+            return content
+        return "\n".join(block.get('text', '') for block in content)
+
+    def _record_usage(self, response):
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        with self._usage_lock:
+            for field in self.usage_totals:
+                self.usage_totals[field] += getattr(usage, field, None) or 0
+        logging.debug(
+            f"LLM usage: {getattr(usage, 'input_tokens', 0)} input, "
+            f"{getattr(usage, 'cache_read_input_tokens', None) or 0} cache read, "
+            f"{getattr(usage, 'cache_creation_input_tokens', None) or 0} cache write, "
+            f"{getattr(usage, 'output_tokens', 0)} output tokens"
+        )
+
+    def _record_call(self, outcome, started, response=None, **fields):
+        if self.telemetry is None:
+            return
+        usage = getattr(response, 'usage', None)
+        tokens = {field: getattr(usage, field, None) or 0 for field in self.usage_totals}
+        if outcome == 'cached':
+            cost = 0.0
+        elif response is not None:
+            cost = estimate_cost(
+                self.anthropic_model, tokens['input_tokens'], tokens['output_tokens'],
+                tokens['cache_creation_input_tokens'], tokens['cache_read_input_tokens']
+            )
+        else:
+            cost = None
+        fields.setdefault('retries', 0)
+        self.telemetry.record(
+            model=self.anthropic_model,
+            outcome=outcome,
+            latency_s=round(time.perf_counter() - started, 4) if started is not None else None,
+            cost_usd=cost,
+            **tokens,
+            **fields
+        )
+
+    def record_batch_usage(self, message, discount=1.0):
+        # Batch results arrive without a live call, so they carry no latency
+        self._record_usage(message)
+        if self.telemetry is None:
+            return
+        usage = getattr(message, 'usage', None)
+        tokens = {field: getattr(usage, field, None) or 0 for field in self.usage_totals}
+        cost = estimate_cost(
+            self.anthropic_model, tokens['input_tokens'], tokens['output_tokens'],
+            tokens['cache_creation_input_tokens'], tokens['cache_read_input_tokens']
+        )
+        self.telemetry.record(
+            model=self.anthropic_model,
+            outcome='ok',
+            latency_s=None,
+            cost_usd=cost * discount if cost is not None else None,
+            retries=0,
+            **tokens
+        )
+
+    def usage_stats(self):
+        with self._usage_lock:
+            return dict(self.usage_totals)
+
+    def cache_stats(self):
+        if not self.response_cache:
+            return None
+        return self.response_cache.stats()
+
+    def submit_for_analysis(self, prompt, bypass_cache=False, tool=None):
+        if not self.client:
+            raise AnalysisError("Anthropic API key not configured.")
+        try:
+            raw_response = self._create_message([{"role": "user", "content": prompt}], bypass_cache, tool=tool)
+        except Exception as e:
+            # Never hand an error message to the parsers as if it were a result
             logging.error(f"Error during analysis: {str(e)}")
-            return "Analysis failed due to an error."
+            raise AnalysisError(f"Analysis failed: {str(e)}") from e
+        logging.debug(f"Raw LLM response: {raw_response}")
+        return raw_response
 
-    def refine_analysis(self, analysis, feedback):
+    def _follow_up_prompt(self, analysis, request, vtt_content=None):
+        # Transcript and analysis come first and carry cache markers, so a series
+        # of follow-ups on one interview only pays full price for the request text.
+        blocks = self._transcript_prefix(self.prompt_transcript(vtt_content)) if vtt_content else []
+        blocks.append({"type": "text", "text": f"Here's an analysis:\n\n{analysis}", "cache_control": {"type": "ephemeral"}})
+        blocks.append({"type": "text", "text": request})
+        return [{"role": "user", "content": blocks}]
+
+    def refine_analysis(self, analysis, feedback, vtt_content=None, bypass_cache=False):
         try:
-            response = self.client.messages.create(
-                model=self.plm.anthropic_model,
-                messages=[
-                    {"role": "user", "content": f"Here's an analysis:\n\n{analysis}\n\nPlease refine this analysis based on the following feedback:\n\n{feedback}"}
-                ],
-                max_tokens=self.plm.anthropic_max_tokens,
-                temperature=self.plm.anthropic_temperature,
-            )
-            return response.content[0].text
+            with self._telemetry_scope(stage='refine'):
+                return self._create_message(self._follow_up_prompt(
+                    analysis, f"Please refine this analysis based on the following feedback:\n\n{feedback}", vtt_content
+                ), bypass_cache)
         except Exception as e:
             print(f"Error during analysis refinement: {str(e)}")
             return "Analysis refinement failed due to an error."
 
-    def ask_question(self, analysis, question):
+    def ask_question(self, analysis, question, vtt_content=None, bypass_cache=False):
         try:
-            response = self.client.messages.create(
-                model=self.plm.anthropic_model,
-                messages=[
-                    {"role": "user", "content": f"Given this analysis:\n\n{analysis}\n\nPlease answer the following question:\n\n{question}"}
-                ],
-                max_tokens=self.plm.anthropic_max_tokens,
-                temperature=self.plm.anthropic_temperature,
-            )
-            return response.content[0].text
+            with self._telemetry_scope(stage='question'):
+                return self._create_message(self._follow_up_prompt(
+                    analysis, f"Please answer the following question:\n\n{question}", vtt_content
+                ), bypass_cache)
         except Exception as e:
             print(f"Error while answering question: {str(e)}")
             return "Failed to answer the question due to an error."
+
+    def qa_session(self, project_name, interview_index, bypass_cache=False):
+        interviews = self.data_manager.get_interview_data(project_name, interview_index)
+        if not interviews:
+            raise AnalysisError(f"Interview {interview_index} not found.")
+        interview = interviews[0]
+        if not interview.get('analysis_results'):
+            raise AnalysisError(f"Interview {interview_index} has not been analyzed yet.")
+        vtt_content = self.get_vtt_content(project_name, interview['vtt_file']) if interview.get('vtt_file') else None
+        return QASession(self, project_name, interview, vtt_content, bypass_cache=bypass_cache)
@@ -0,0 +1,308 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from .structured import ANALYSIS_TOOL, META_ANALYSIS_TOOL, response_text
+
+
+# Local stand-in for the provider's message batches API (create, retrieve,
+# results). Requests are kept on disk and answered one by one with
+# messages.create when the batch is retrieved, so a batch survives restarts.
+class LocalMessageBatches:
+    def __init__(self, client, directory):
+        self.client = client
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id):
+        return os.path.join(self.directory, f"{batch_id}.json")
+
+    def _load(self, batch_id):
+        with open(self._path(batch_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, batch):
+        tmp_path = f"{self._path(batch['id'])}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(batch, f)
+        os.replace(tmp_path, self._path(batch['id']))
+
+    def create(self, requests):
+        batch = {
+            'id': f"localbatch_{uuid.uuid4().hex}",
+            'created_at': datetime.now().isoformat(),
+            'requests': list(requests),
+            'results': {}
+        }
+        with self._lock:
+            self._save(batch)
+        return self._status(batch)
+
+    def retrieve(self, batch_id):
+        with self._lock:
+            batch = self._load(batch_id)
+            for request in batch['requests']:
+                custom_id = request['custom_id']
+                if custom_id in batch['results']:
+                    continue
+                try:
+                    message = self.client.messages.create(**request['params'])
+                    batch['results'][custom_id] = {
+                        'type': 'succeeded',
+                        'text': response_text(message),
+                        'usage': {
+                            'input_tokens': getattr(message.usage, 'input_tokens', 0),
+                            'output_tokens': getattr(message.usage, 'output_tokens', 0)
+                        }
+                    }
+                except Exception as e:
+                    batch['results'][custom_id] = {'type': 'errored', 'error': str(e)}
+                # Persist after every request so a restart resumes where it stopped
+                self._save(batch)
+            return self._status(batch)
+
+    def results(self, batch_id):
+        batch = self._load(batch_id)
+        for custom_id, result in batch['results'].items():
+            if result['type'] == 'succeeded':
+                message = SimpleNamespace(
+                    content=[SimpleNamespace(type='text', text=result['text'])],
+                    usage=SimpleNamespace(**result['usage'])
+                )
+                yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type='succeeded', message=message))
+            else:
+                error = SimpleNamespace(message=result.get('error', ''))
+                yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type=result['type'], error=error))
+
+    def _status(self, batch):
+        finished = len(batch['results'])
+        succeeded = sum(1 for result in batch['results'].values() if result['type'] == 'succeeded')
+        return SimpleNamespace(
+            id=batch['id'],
+            processing_status='ended' if finished == len(batch['requests']) else 'in_progress',
+            request_counts=SimpleNamespace(
+                processing=len(batch['requests']) - finished,
+                succeeded=succeeded,
+                errored=finished - succeeded,
+                canceled=0,
+                expired=0
+            )
+        )
+
+
+# Builds every request of a large analysis run up front, submits them as one
+# message batch and records the batch ID in the project data. Status checks
+# and result collection can happen in a later process.
+class BatchJobManager:
+    def __init__(self, analysis_engine, batch_dir, use_provider_batches=True):
+        self.engine = analysis_engine
+        self.data_manager = analysis_engine.data_manager
+        self.batch_dir = batch_dir
+        self.use_provider_batches = use_provider_batches
+        self._local_batches = None
+
+    @property
+    def batches(self):
+        client = self.engine.client
+        if client is None:
+            raise ValueError("Anthropic API key not configured.")
+        provider_batches = getattr(getattr(client, 'messages', None), 'batches', None)
+        if self.use_provider_batches and provider_batches is not None:
+            return provider_batches
+        if self._local_batches is None:
+            self._local_batches = LocalMessageBatches(client, self.batch_dir)
+        return self._local_batches
+
+    def _request(self, custom_id, prompt, tool):
+        return {
+            'custom_id': custom_id,
+            'params': {
+                'model': self.engine.anthropic_model,
+                'max_tokens': self.engine.anthropic_max_tokens,
+                'temperature': self.engine.anthropic_temperature,
+                'messages': [{"role": "user", "content": prompt}],
+                'tools': [tool],
+                'tool_choice': {'type': 'tool', 'name': tool['name']}
+            }
+        }
+
+    def _submit(self, project_name, kind, requests, units):
+        batch = self.batches.create(requests=requests)
+        job = {
+            'id': batch.id,
+            'kind': kind,
+            'backend': 'local' if isinstance(self.batches, LocalMessageBatches) else 'provider',
+            'submitted_at': datetime.now().isoformat(),
+            'status': 'submitted',
+            'units': units
+        }
+        self.data_manager.add_batch_job(project_name, job)
+        return job
+
+    def _pending_units(self, project_name, kind):
+        # Units of batches that were submitted but not collected yet, by custom ID and fingerprint
+        return {
+            (custom_id, json.dumps(unit['fingerprint'], sort_keys=True))
+            for job in self.data_manager.get_batch_jobs(project_name)
+            if job['kind'] == kind and job['status'] in ('submitted', 'ended')
+            for custom_id, unit in job['units'].items()
+        }
+
+    def submit_analysis(self, project_name, argument='all', force=False):
+        learning_goals = self.data_manager.get_learning_goals(project_name)
+        interviews = self.data_manager.get_interview_data(project_name, argument)
+        if not force:
+            interviews = [interview for interview in interviews if self.engine._needs_analysis(project_name, interview, learning_goals)]
+        # Without --force, a request already waiting in a batch is not paid for twice
+        pending = set() if force else self._pending_units(project_name, 'analysis')
+
+        requests = []
+        units = {}
+        skipped = 0
+        for interview in interviews:
+            vtt_content = self.engine.get_vtt_content(project_name, interview['vtt_file'])
+            if vtt_content is None:
+                logging.error(f"Skipping interview {interview['index']}: VTT file not found or unreadable")
+                continue
+            custom_id = f"interview-{interview['index']}"
+            fingerprint = self.engine.analysis_fingerprint(vtt_content, learning_goals)
+            if (custom_id, json.dumps(fingerprint, sort_keys=True)) in pending:
+                skipped += 1
+                continue
+            requests.append(self._request(custom_id, self.engine.create_analysis_prompt(vtt_content, learning_goals), ANALYSIS_TOOL))
+            units[custom_id] = {
+                'interview_index': interview['index'],
+                'vtt_file': interview['vtt_file'],
+                'fingerprint': fingerprint
+            }
+        if skipped:
+            print(f"Skipping {skipped} interview(s) already waiting in a batch. Use --force to submit them again.")
+        if not requests:
+            return None
+        return self._submit(project_name, 'analysis', requests, units)
+
+    def submit_meta_analysis(self, project_name, force=False):
+        learning_goals = self.data_manager.get_learning_goals(project_name)
+        interviews = self.data_manager.get_interview_data(project_name)
+        plan = self.engine.plan_meta_analysis(project_name, interviews, learning_goals)
+        previous_chunks = {} if force else self.data_manager.get_meta_analysis_chunks(project_name)
+        pending = set() if force else {json.loads(fingerprint) for _, fingerprint in self._pending_units(project_name, 'meta_analysis')}
+
+        requests = []
+        units = {}
+        skipped = 0
+        for number, chunk in enumerate(plan.chunks, 1):
+            fingerprint = self.engine._chunk_fingerprint(chunk.digests, learning_goals)
+            if fingerprint in previous_chunks:
+                continue
+            if fingerprint in pending:
+                skipped += 1
+                continue
+            custom_id = f"chunk-{number}"
+            prompt = self.engine._create_meta_analysis_prompt(learning_goals, chunk.render())
+            requests.append(self._request(custom_id, prompt, META_ANALYSIS_TOOL))
+            units[custom_id] = {'fingerprint': fingerprint, 'digests': chunk.digests}
+        if skipped:
+            print(f"Skipping {skipped} chunk(s) already waiting in a batch. Use --force to submit them again.")
+        if not requests:
+            return None
+        return self._submit(project_name, 'meta_analysis', requests, units)
+
+    def status(self, project_name):
+        statuses = []
+        for job in self.data_manager.get_batch_jobs(project_name):
+            if job['status'] == 'submitted':
+                batch = self.batches.retrieve(job['id'])
+                if batch.processing_status == 'ended':
+                    job['status'] = 'ended'
+                    self.data_manager.update_batch_job(project_name, job['id'], {'status': 'ended'})
+                statuses.append((job, batch.request_counts))
+            else:
+                statuses.append((job, None))
+        return statuses
+
+    def collect(self, project_name):
+        collected = []
+        self.status(project_name)
+        for job in self.data_manager.get_batch_jobs(project_name):
+            if job['status'] != 'ended':
+                continue
+            with self.engine._telemetry_scope(project=project_name, run=job['id'], stage='batch'):
+                if job['kind'] == 'analysis':
+                    self._collect_analysis(project_name, job)
+                else:
+                    self._collect_meta_analysis(project_name, job)
+            self.data_manager.update_batch_job(project_name, job['id'], {
+                'status': 'collected',
+                'collected_at': datetime.now().isoformat()
+            })
+            collected.append(job)
+        return collected
+
+    def _succeeded_results(self, job):
+        for entry in self.batches.results(job['id']):
+            if entry.result.type != 'succeeded':
+                error = getattr(entry.result, 'error', None)
+                logging.error(f"Batch request {entry.custom_id} in {job['id']} {entry.result.type}: {error}")
+                continue
+            message = entry.result.message
+            # Provider batches are billed at half the regular price
+            self.engine.record_batch_usage(message, discount=1.0 if job.get('backend') == 'local' else 0.5)
+            yield entry.custom_id, response_text(message)
+
+    def _collect_analysis(self, project_name, job):
+        learning_goals = self.data_manager.get_learning_goals(project_name)
+        for custom_id, text in self._succeeded_results(job):
+            unit = job['units'].get(custom_id)
+            if unit is None:
+                continue
+            vtt_content = self.engine.get_vtt_content(project_name, unit['vtt_file']) if unit.get('vtt_file') else None
+            # A result for a transcript or goals that changed since submission is
+            # stale, and must not overwrite a newer live analysis
+            if vtt_content is None or self.engine.analysis_fingerprint(vtt_content, learning_goals) != unit['fingerprint']:
+                print(f"Skipping batch result for interview {unit['interview_index']}: its inputs changed since the batch was submitted.")
+                continue
+            # With the transcript available, invalid output gets repair requests like a live run
+            prompt = self.engine.create_analysis_prompt(vtt_content, learning_goals) if vtt_content else None
+            try:
+                results = self.engine.validate_structured_response(prompt, text, learning_goals['preprocessed'])
+            except Exception as e:
+                logging.error(f"Discarding batch result {custom_id} in {job['id']}: {str(e)}")
+                continue
+            results = self.engine._post_process_results([result.to_dict() for result in results])
+            results = self.engine.resolve_evidence(results, vtt_content)
+            self.data_manager.save_analysis_results(project_name, unit['interview_index'], results, unit['fingerprint'])
+
+    def _collect_meta_analysis(self, project_name, job):
+        learning_goals = self.data_manager.get_learning_goals(project_name)
+        chunk_results = dict(self.data_manager.get_meta_analysis_chunks(project_name))
+        chunk_parts = dict(self.data_manager.get_meta_analysis_chunk_parts(project_name))
+        for custom_id, text in self._succeeded_results(job):
+            unit = job['units'].get(custom_id)
+            if unit is None:
+                continue
+            try:
+                results = self.engine.validate_structured_response(None, text, learning_goals['preprocessed'], meta=True)
+            except Exception as e:
+                # The chunk is submitted again in the follow-up batch below
+                logging.error(f"Discarding batch result {custom_id} in {job['id']}: {str(e)}")
+                continue
+            chunk_results[unit['fingerprint']] = [result.to_dict() for result in results]
+            if unit.get('digests'):
+                chunk_parts[unit['fingerprint']] = unit['digests']
+        self.data_manager.save_meta_analysis_chunks(project_name, chunk_results, chunk_parts)
+        # This batch no longer counts as pending, so its discarded chunks can be submitted again
+        self.data_manager.update_batch_job(project_name, job['id'], {'status': 'collected'})
+        # Chunks without a usable result, or whose inputs changed since submission,
+        # go into a follow-up batch instead of being analyzed live here
+        follow_up = self.submit_meta_analysis(project_name)
+        if follow_up:
+            print(f"{len(follow_up['units'])} chunk(s) still need analysis; submitted them as batch {follow_up['id']}. "
+                  f"Run 'batch_collect' again once it has finished.")
+            return
+        # Every chunk is now stored, so this only runs the (small) synthesis stage
+        self.engine.perform_meta_analysis(project_name)
@@ -0,0 +1,220 @@
+import io
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, List, Optional, Sequence
+from .token_counter import content_hash
+
+
+@dataclass
+class ChunkPart:
+    interview_index: int
+    text: Optional[str]
+    tokens: int
+    part: int = 1
+    part_count: int = 1
+    # Hash of the rendered part, so chunks can be fingerprinted without their text
+    digest: str = ''
+    # Reloads the text when the plan was built without keeping it in memory
+    load: Optional[Callable[[], str]] = field(default=None, repr=False, compare=False)
+
+    @property
+    def label(self):
+        if self.part_count > 1:
+            return f"Interview {self.interview_index} (part {self.part} of {self.part_count})"
+        return f"Interview {self.interview_index}"
+
+    def render(self):
+        text = self.text if self.text is not None else self.load()
+        return f"--- {self.label} ---\n{text}"
+
+
+@dataclass
+class Chunk:
+    parts: List[ChunkPart] = field(default_factory=list)
+    tokens: int = 0
+
+    def add(self, part):
+        self.parts.append(part)
+        self.tokens += part.tokens
+
+    @property
+    def digests(self):
+        return [part.digest for part in self.parts]
+
+    def render(self):
+        # Parts are rendered one at a time, so only the finished chunk text is held in full
+        buffer = io.StringIO()
+        for position, part in enumerate(self.parts):
+            if position:
+                buffer.write("\n\n")
+            buffer.write(part.render())
+        return buffer.getvalue()
+
+
+@dataclass
+class ChunkPlan:
+    chunks: List[Chunk]
+    input_token_budget: int
+    split_interviews: List[int]
+
+    @property
+    def call_count(self):
+        return len(self.chunks)
+
+
+CUE_SEPARATOR = re.compile(r'\n\s*\n')
+# Raw VTT cues ("1\n00:00:05.000 --> ...\nAlice: ...") or compacted turns ("[00:00:05] Alice: ...")
+SPEAKER_PATTERN = re.compile(r'^(?:\d+\s*\n)?(?:[^\n]*-->[^\n]*\n)?(?:\[[\d:.]+\]\s*)?([^:\n]+):', re.MULTILINE)
+# Alias legend at the top of a compacted transcript ("Speakers: S1 = Alice, ...")
+LEGEND_PATTERN = re.compile(r'^Speakers:')
+
+
+# Packs transcripts into as few prompts as possible (first-fit decreasing)
+# against an input-token budget. Transcripts that cannot fit in one prompt on
+# their own are split on speaker-turn boundaries first. Transcripts can be
+# given as a generator; with a reload callback the plan keeps only token counts
+# and digests, and each part's text is reloaded when its chunk is rendered.
+#
+# Chunks of a previous plan (lists of part digests) whose parts are all
+# unchanged are kept as they were, and only new or changed parts are packed,
+# into new chunks. Adding an interview then leaves the other chunks, and their
+# stored results, alone. The cost is that kept chunks are not refilled, so the
+# plan can use more calls than a full repack until the previous plan is dropped.
+class ChunkPlanner:
+    def __init__(self, input_token_budget: int, count_tokens: Callable[[str], int], part_overhead_tokens: int = 16):
+        if input_token_budget <= 0:
+            raise ValueError("The input token budget must leave room for transcripts.")
+        self.input_token_budget = input_token_budget
+        self.count_tokens = count_tokens
+        self.part_overhead_tokens = part_overhead_tokens
+
+    def plan(self, transcripts, reload: Optional[Callable[[int], str]] = None,
+             previous: Optional[Sequence[Sequence[str]]] = None) -> ChunkPlan:
+        parts = []
+        split_interviews = []
+        for interview_index, text in transcripts:
+            interview_parts = self._split_transcript(interview_index, text)
+            if len(interview_parts) > 1:
+                split_interviews.append(interview_index)
+            for part in interview_parts:
+                part.digest = content_hash(part.render())
+                if reload is not None:
+                    part.text = None
+                    part.load = partial(self._reload_part, reload, interview_index, part.part)
+            parts.extend(interview_parts)
+
+        kept, remaining = self._keep_previous(parts, previous or [])
+        chunks: List[Chunk] = []
+        # Largest first; sorted() is stable so equal sizes keep interview order
+        for part in sorted(remaining, key=lambda p: p.tokens, reverse=True):
+            target: Optional[Chunk] = None
+            for chunk in chunks:
+                if chunk.tokens + part.tokens <= self.input_token_budget:
+                    target = chunk
+                    break
+            if target is None:
+                target = Chunk()
+                chunks.append(target)
+            target.add(part)
+
+        # Present each new chunk in interview order so prompts read naturally;
+        # kept chunks keep their part order, which their fingerprint depends on
+        order = {id(part): position for position, part in enumerate(parts)}
+        for chunk in chunks:
+            chunk.parts.sort(key=lambda p: order[id(p)])
+        chunks = kept + chunks
+        chunks.sort(key=lambda c: order[id(c.parts[0])])
+        return ChunkPlan(chunks, self.input_token_budget, split_interviews)
+
+    def _keep_previous(self, parts, previous):
+        available = {}
+        for part in parts:
+            available.setdefault(part.digest, []).append(part)
+        kept = []
+        for digests in previous:
+            needed = Counter(digests)
+            if not digests or any(len(available.get(digest, ())) < count for digest, count in needed.items()):
+                continue
+            chunk = Chunk()
+            for digest in digests:
+                chunk.add(available[digest].pop(0))
+            if chunk.tokens > self.input_token_budget:
+                # The budget shrank since the previous plan; its parts are packed again
+                for part in reversed(chunk.parts):
+                    available[part.digest].insert(0, part)
+                continue
+            kept.append(chunk)
+        used = {id(part) for chunk in kept for part in chunk.parts}
+        return kept, [part for part in parts if id(part) not in used]
+
+    def _reload_part(self, reload, interview_index, number):
+        # Splitting is deterministic, so the same text yields the same parts again
+        parts = self._split_transcript(interview_index, reload(interview_index))
+        return parts[number - 1].text
+
+    def _part_tokens(self, text):
+        return self.count_tokens(text) + self.part_overhead_tokens
+
+    def _split_transcript(self, interview_index, text) -> List[ChunkPart]:
+        tokens = self._part_tokens(text)
+        if tokens <= self.input_token_budget:
+            return [ChunkPart(interview_index, text, tokens)]
+
+        pieces = []
+        current = []
+        current_tokens = 0
+        for turn in self._speaker_turns(text):
+            for piece in self._fit(turn):
+                # One extra token covers the separator added when pieces are joined
+                piece_tokens = self.count_tokens(piece) + 1
+                if current and current_tokens + piece_tokens + self.part_overhead_tokens > self.input_token_budget:
+                    pieces.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += piece_tokens
+        if current:
+            pieces.append("\n\n".join(current))
+
+        return [
+            ChunkPart(interview_index, piece, self._part_tokens(piece), part=number, part_count=len(pieces))
+            for number, piece in enumerate(pieces, 1)
+        ]
+
+    def _speaker_turns(self, text):
+        turns = []
+        current = []
+        current_speaker = None
+        legend = []
+        for cue in CUE_SEPARATOR.split(text.strip()):
+            if LEGEND_PATTERN.match(cue):
+                # The legend is not a speaker; it stays with the turn that follows it
+                legend.append(cue)
+                continue
+            match = SPEAKER_PATTERN.match(cue)
+            speaker = match.group(1).strip() if match else current_speaker
+            if current and speaker != current_speaker:
+                turns.append("\n\n".join(current))
+                current = []
+            current.extend(legend)
+            legend = []
+            current.append(cue)
+            current_speaker = speaker
+        if current or legend:
+            turns.append("\n\n".join(current + legend))
+        return turns
+
+    def _fit(self, turn):
+        # A single speaker turn larger than the budget is split on cues, then lines
+        if self._part_tokens(turn) <= self.input_token_budget:
+            return [turn]
+        cues = CUE_SEPARATOR.split(turn)
+        if len(cues) > 1:
+            return [piece for cue in cues for piece in self._fit(cue)]
+        lines = turn.split('\n')
+        if len(lines) > 1:
+            return [piece for line in lines for piece in self._fit(line)]
+        # Last resort for a single enormous line: split on characters
+        limit = max(1, len(turn) * (self.input_token_budget - self.part_overhead_tokens) // max(1, self.count_tokens(turn)))
+        return [turn[start:start + limit] for start in range(0, len(turn), limit)]
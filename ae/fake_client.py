@@ -0,0 +1,147 @@
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+
+# Stand-in for anthropic.Client that answers locally after an injected delay.
+# Used to exercise the analysis pipeline without network access or API costs.
+class FakeClient:
+    def __init__(self, latency=0.0, responder=None, stream_chunk_size=16):
+        self.latency = latency
+        self.stream_chunk_size = stream_chunk_size
+        self.responder = responder or default_responder
+        self.messages = FakeMessages(self)
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text):
+        return len(text) // 4
+
+
+class FakeMessages:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, model, messages, max_tokens, temperature=None, tools=None, **kwargs):
+        client = self._client
+        with client._lock:
+            client.calls += 1
+            client._in_flight += 1
+            client.max_in_flight = max(client.max_in_flight, client._in_flight)
+        try:
+            latency = client.latency() if callable(client.latency) else client.latency
+            if latency:
+                time.sleep(latency)
+            text = client.responder(messages)
+        finally:
+            with client._lock:
+                client._in_flight -= 1
+        prompt = _prompt_text(messages)
+        prefix = _cached_prefix(messages)
+        cache_read = cache_write = 0
+        if prefix:
+            # Only a hash is kept, so long runs do not hold every prompt in memory
+            prefix_key = hash(prefix)
+            with client._lock:
+                if prefix_key in client._cached_prefixes:
+                    cache_read = len(prefix) // 4
+                else:
+                    client._cached_prefixes.add(prefix_key)
+                    cache_write = len(prefix) // 4
+        if tools and isinstance(text, dict):
+            content = [SimpleNamespace(type='tool_use', name=tools[0]['name'], input=text)]
+            text = json.dumps(text)
+        else:
+            # Without tools, structured output is streamed as JSON lines
+            if isinstance(text, dict):
+                text = "\n".join(json.dumps(result) for result in text['results'])
+            content = [SimpleNamespace(type='text', text=text)]
+        return SimpleNamespace(
+            content=content,
+            model=model,
+            stop_reason='end_turn',
+            usage=SimpleNamespace(
+                input_tokens=len(prompt) // 4 - cache_read - cache_write,
+                output_tokens=len(text) // 4,
+                cache_creation_input_tokens=cache_write,
+                cache_read_input_tokens=cache_read
+            )
+        )
+
+
+    def stream(self, model, messages, max_tokens, temperature=None, **kwargs):
+        return FakeStream(self.create(model, messages, max_tokens, temperature, **kwargs), self._client.stream_chunk_size)
+
+
+class FakeStream:
+    def __init__(self, message, chunk_size):
+        self._message = message
+        self._chunk_size = chunk_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        text = self._message.content[0].text if self._message.content[0].type == 'text' else ''
+        for start in range(0, len(text), self._chunk_size):
+            yield text[start:start + self._chunk_size]
+
+    def get_final_message(self):
+        return self._message
+
+
+def _prompt_text(messages):
+    parts = []
+    for message in messages:
+        content = message['content']
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get('text', '') for block in content)
+    return "\n".join(parts)
+
+
+def _cached_prefix(messages):
+    # Text up to and including the last block carrying a cache_control marker
+    prefix = []
+    cached = ''
+    for message in messages:
+        content = message['content']
+        if isinstance(content, str):
+            prefix.append(content)
+            continue
+        for block in content:
+            prefix.append(block.get('text', ''))
+            if block.get('cache_control'):
+                cached = "\n".join(prefix)
+    return cached
+
+
+def default_responder(messages):
+    prompt = _prompt_text(messages)
+    goals_section = prompt.split('Learning Goals:', 1)[-1].strip().split('\n\n', 1)[0]
+    goal_numbers = [int(number) for number in re.findall(r'^\s*(\d+)\. ', goals_section, re.MULTILINE)] or [1]
+    meta = 'record_meta_analysis' in prompt
+    results = []
+    for index in goal_numbers:
+        results.append({
+            'goal': index,
+            'answer': f"Fake answer for learning goal {index}.",
+            'evidence': [{
+                'timestamp': '00:00:00',
+                'quote': 'Fake quote',
+                'context': 'Fake interview',
+                'explanation': 'Generated by the fake client.'
+            }],
+            'confidence': 20 if meta else 'Low'
+        })
+    return {'results': results}
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+UNFINISHED_STATUSES = ('running', 'interrupted', 'failed')
+# A job in one of these states is never resumed, so its record is deleted
+DONE_STATUSES = ('completed', 'superseded')
+
+
+# Persistent record of one analysis run. The record is an append-only JSON
+# lines file: a header, then one line per planned batch of units, finished
+# unit (with its output) and status change. Appending keeps every checkpoint
+# O(1) and leaves a readable record if the process dies mid-write. The file
+# is deleted once the job is completed or superseded, so only resumable jobs
+# are kept on disk.
+class Job:
+    def __init__(self, path, header):
+        self.path = path
+        self.id = header['id']
+        self.kind = header['kind']
+        self.project_name = header['project_name']
+        self.params = header.get('params', {})
+        self.created_at = header['created_at']
+        self.status = 'running'
+        self.planned_units = []
+        self.outputs = {}
+        self.error = None
+        self._planned = set()
+        self._lock = threading.Lock()
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _apply(self, record):
+        if record['type'] == 'plan':
+            for unit in record['units']:
+                if unit not in self._planned:
+                    self._planned.add(unit)
+                    self.planned_units.append(unit)
+        elif record['type'] == 'unit':
+            self.outputs[record['unit']] = record.get('output')
+        elif record['type'] == 'status':
+            self.status = record['status']
+            self.error = record.get('error')
+
+    def plan(self, units):
+        with self._lock:
+            new_units = [unit for unit in units if unit not in self._planned]
+            if new_units:
+                record = {'type': 'plan', 'units': new_units}
+                self._append(record)
+                self._apply(record)
+
+    def is_finished(self, unit):
+        with self._lock:
+            return unit in self.outputs
+
+    def output(self, unit):
+        with self._lock:
+            return self.outputs.get(unit)
+
+    def mark_finished(self, unit, output=None):
+        with self._lock:
+            record = {'type': 'unit', 'unit': unit, 'output': output, 'finished_at': datetime.now().isoformat()}
+            self._append(record)
+            self._apply(record)
+
+    def set_status(self, status, error=None):
+        with self._lock:
+            record = {'type': 'status', 'status': status, 'at': datetime.now().isoformat()}
+            if error:
+                record['error'] = error
+            self._apply(record)
+            if status in DONE_STATUSES:
+                _remove(self.path)
+            else:
+                self._append(record)
+
+    def unfinished_units(self):
+        with self._lock:
+            return [unit for unit in self.planned_units if unit not in self.outputs]
+
+    def progress(self):
+        with self._lock:
+            return len(self.outputs), len(self.planned_units)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class JobStore:
+    def __init__(self, project_data_dir):
+        self.project_data_dir = project_data_dir
+
+    def _jobs_dir(self, project_name):
+        return os.path.join(self.project_data_dir, project_name, 'jobs')
+
+    def create(self, project_name, kind, params=None, planned_units=None):
+        jobs_dir = self._jobs_dir(project_name)
+        os.makedirs(jobs_dir, exist_ok=True)
+        created_at = datetime.now()
+        job_id = f"{created_at.strftime('%Y%m%d-%H%M%S')}-{kind}-{uuid.uuid4().hex[:8]}"
+        header = {
+            'type': 'job',
+            'id': job_id,
+            'kind': kind,
+            'project_name': project_name,
+            'params': params or {},
+            'created_at': created_at.isoformat()
+        }
+        job = Job(os.path.join(jobs_dir, f"{job_id}.jsonl"), header)
+        job._append(header)
+        if planned_units:
+            job.plan(planned_units)
+        self._supersede(job)
+        return job
+
+    def _supersede(self, job):
+        # An older unfinished job whose remaining units are all planned again by the
+        # new job must not be resumed, or that work would be sent to the LLM twice
+        planned = set(job.planned_units)
+        for job_id, kind, status in self._summaries(job.project_name):
+            if job_id == job.id or kind != job.kind or status not in UNFINISHED_STATUSES:
+                continue
+            previous = self.load(job.project_name, job_id)
+            if previous is not None and set(previous.unfinished_units()) <= planned:
+                previous.set_status('superseded', f"Superseded by job {job.id}")
+
+    def load(self, project_name, job_id):
+        path = os.path.join(self._jobs_dir(project_name), f"{job_id}.jsonl")
+        job = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write is ignored
+                    continue
+                if record['type'] == 'job':
+                    job = Job(path, record)
+                elif job is not None:
+                    job._apply(record)
+        return job
+
+    def _summaries(self, project_name):
+        # (id, kind, status) of every job, oldest first, from the header and status
+        # lines only; unit lines, which hold the outputs, are not parsed
+        jobs_dir = self._jobs_dir(project_name)
+        if not os.path.isdir(jobs_dir):
+            return []
+        summaries = []
+        for name in sorted(os.listdir(jobs_dir)):
+            if not name.endswith('.jsonl'):
+                continue
+            path = os.path.join(jobs_dir, name)
+            kind, status = None, 'running'
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.startswith(('{"type": "job"', '{"type": "status"')):
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record['type'] == 'job':
+                        kind = record['kind']
+                    else:
+                        status = record['status']
+            if kind is None:
+                continue
+            if status in DONE_STATUSES:
+                # Left behind by a version that kept finished jobs
+                _remove(path)
+                continue
+            summaries.append((name[:-len('.jsonl')], kind, status))
+        return summaries
+
+    def latest_unfinished(self, project_name, kind=None):
+        for job_id, job_kind, status in reversed(self._summaries(project_name)):
+            if status in UNFINISHED_STATUSES and (kind is None or job_kind == kind):
+                return self.load(project_name, job_id)
+        return None
@@ -0,0 +1,50 @@
+import logging
+import threading
+
+import anthropic
+
+# The SDK's HTTP backend exposes its limits type through its defaults, so it
+# does not have to be imported separately
+Limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+
+_clients = {}
+_lock = threading.Lock()
+
+
+# One Anthropic client per API key, base URL and pool settings for the whole
+# process, so every AnalysisEngine reuses the same HTTP connection pool
+# (keep-alive connections and TLS sessions). The pool is sized for the configured concurrency: each
+# worker can hold one connection, including for the length of a stream.
+def shared_client(api_key, base_url=None, max_connections=8, timeout=600.0, connect_timeout=10.0, keepalive_expiry=30.0):
+    key = (api_key, base_url, max_connections, timeout, connect_timeout, keepalive_expiry)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+        client_timeout = anthropic.Timeout(timeout, connect=connect_timeout)
+        http_client = anthropic.DefaultHttpxClient(
+            limits=Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=client_timeout
+        )
+        # Retries are handled by RetryPolicy so they can adapt concurrency
+        client = anthropic.Anthropic(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            timeout=client_timeout,
+            http_client=http_client
+        )
+        _clients[key] = client
+        logging.debug(f"Created shared Anthropic client with up to {max_connections} connection(s)")
+        return client
+
+
+def close_shared_clients():
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+from rich.console import Console
+from rich.table import Table
+
+WORDS = (
+    "we track onboarding in a spreadsheet and the handoff to support is slow because nobody owns the "
+    "customer notes so I end up asking sales for context every week which is frustrating when deadlines move"
+).split()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def write_project(directory, project_name, interviews, turns, seed=7):
+    # Synthetic transcripts written one at a time; returns the corpus size in bytes
+    rng = random.Random(seed)
+    vtt_dir = os.path.join(directory, 'project_data', project_name, 'vtt')
+    os.makedirs(vtt_dir, exist_ok=True)
+    project = {
+        'name': project_name,
+        'directory': os.path.join(directory, 'project_data', project_name),
+        'principal_investigator': 'Benchmark',
+        'learning_goals': {
+            'raw': '',
+            'preprocessed': [
+                {'index': 1, 'content': 'How do teams hand off customer context?'},
+                {'index': 2, 'content': 'What slows onboarding down?'}
+            ]
+        },
+        'interviews': [],
+        'unassociated_files': []
+    }
+    corpus_bytes = 0
+    for index in range(1, interviews + 1):
+        filename = f"interview-{index}.vtt"
+        lines = ['WEBVTT', '']
+        for turn in range(turns):
+            start = turn * 6
+            speaker = 'Interviewer' if turn % 2 == 0 else f"Participant {index}"
+            text = ' '.join(rng.choice(WORDS) for _ in range(24))
+            lines += [
+                str(turn + 1),
+                f"{start // 3600:02d}:{start % 3600 // 60:02d}:{start % 60:02d}.000 --> "
+                f"{(start + 5) // 3600:02d}:{(start + 5) % 3600 // 60:02d}:{(start + 5) % 60:02d}.000",
+                f"{speaker}: {text}",
+                ''
+            ]
+        content = '\n'.join(lines)
+        with open(os.path.join(vtt_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(content)
+        corpus_bytes += len(content.encode('utf-8'))
+        project['interviews'].append({'index': index, 'name': f"Interview {index}", 'vtt_file': filename})
+    with open(os.path.join(directory, 'project_data', 'qr-ai-data.json'), 'w') as f:
+        json.dump({'projects': [project]}, f)
+    return corpus_bytes
+
+
+def run_child(interviews, turns, input_token_budget, transcript_cache_mb):
+    from plm.data_manager import DataManager
+    from ae.ae import AnalysisEngine
+    from ae.fake_client import FakeClient
+    from ae.transcript_store import TranscriptStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        corpus_bytes = write_project(directory, 'benchmark', interviews, turns)
+        data_manager = DataManager(os.path.join(directory, 'project_data', 'qr-ai-data.json'))
+        engine = AnalysisEngine(
+            data_manager, None, 4000, client=FakeClient(), input_token_budget=input_token_budget,
+            transcript_store=TranscriptStore(max_bytes=transcript_cache_mb * 1024 * 1024)
+        )
+        baseline = peak_rss_mb()
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.perform_meta_analysis('benchmark')
+        print(json.dumps({
+            'interviews': interviews,
+            'corpus_mb': corpus_bytes / (1024 * 1024),
+            'chunk_calls': len(data_manager.get_meta_analysis_chunks('benchmark')),
+            'baseline_mb': baseline,
+            'peak_mb': peak_rss_mb()
+        }))
+
+
+# Runs meta-analysis against the fake client on synthetic projects of growing
+# size, each in a fresh process, and reports peak RSS. With streamed input the
+# peak should stay flat while the corpus grows.
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of meta-analysis by project size")
+    parser.add_argument('--interviews', default='25,100,400', help="Comma-separated project sizes")
+    parser.add_argument('--turns', type=int, default=300, help="Speaker turns per interview")
+    parser.add_argument('--input-token-budget', type=int, default=20000)
+    parser.add_argument('--transcript-cache-mb', type=int, default=0,
+                        help="Transcript cache size; 0 measures the streaming pipeline alone")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.turns, args.input_token_budget, args.transcript_cache_mb)
+        return
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    table = Table(title="Meta-analysis peak memory")
+    for column in ('Interviews', 'Corpus (MB)', 'Chunk calls', 'Baseline RSS (MB)', 'Peak RSS (MB)', 'Growth (MB)'):
+        table.add_column(column, justify='right')
+    for interviews in [int(size) for size in args.interviews.split(',')]:
+        output = subprocess.run(
+            [sys.executable, '-m', 'ae.memory_benchmark', '--child', str(interviews), '--turns', str(args.turns),
+             '--input-token-budget', str(args.input_token_budget), '--transcript-cache-mb', str(args.transcript_cache_mb)],
+            cwd=repo_dir, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        table.add_row(
+            str(result['interviews']), f"{result['corpus_mb']:.1f}", str(result['chunk_calls']),
+            f"{result['baseline_mb']:.1f}", f"{result['peak_mb']:.1f}", f"{result['peak_mb'] - result['baseline_mb']:.1f}"
+        )
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    main()
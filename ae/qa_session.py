@@ -0,0 +1,151 @@
+import re
+from typing import Dict, List, Optional
+
+from .streaming import goal_number
+
+GOAL_REFERENCE = re.compile(r'\b(?:learning\s+)?goals?\s*(?:#|number|no\.?)?\s*(\d+)\b', re.IGNORECASE)
+CONFIDENCE_LEVEL = re.compile(r'\b(high|medium|low)\b', re.IGNORECASE)
+# A question is answered from the stored results only if every word in it (after
+# goal references like "goal 2") belongs to a plain lookup. Any other word, such as
+# a filter ("mention pricing", "about onboarding") or a judgement ("best", "why"),
+# changes what is asked, so the question goes to the model.
+LOOKUP_WORDS = frozenset((
+    'how', 'many', 'number', 'of', 'quote', 'quotes', 'evidence', 'goal', 'goals', 'learning', 'for', 'the', 'a',
+    'an', 'is', 'are', 'was', 'were', 'what', "what's", 'which', 'list', 'show', 'give', 'display', 'print', 'me',
+    'tell', 'all', 'each', 'every', 'there', 'do', 'does', 'have', 'has', 'answer', 'answers', 'confidence',
+    'level', 'levels', 'in', 'to', 'high', 'medium', 'low', 'stored', 'please'
+))
+LOOKUP_WORD = re.compile(r"[a-z0-9']+")
+
+
+# Interactive follow-up questions about one analyzed interview. The transcript
+# and stored analysis results are sent once as a cached prefix and the
+# conversation grows behind them, so each new question only pays full price for
+# itself and the turns since the last cache write. Plain lookups (counts,
+# quotes, confidences, stored answers) are answered from the stored results
+# without calling the model.
+class QASession:
+    def __init__(self, engine, project_name, interview, vtt_content=None, max_turns=20, bypass_cache=False):
+        self.engine = engine
+        self.project_name = project_name
+        self.interview = interview
+        self.vtt_content = vtt_content
+        self.max_turns = max_turns
+        self.bypass_cache = bypass_cache
+        self.results = list(interview.get('analysis_results') or [])
+        self.results_by_goal = {goal_number(result['learning_goal']): result for result in self.results}
+        self.turns = []
+        self.llm_calls = 0
+        self.local_answers = 0
+        self._prefix = None
+
+    def ask(self, question):
+        question = question.strip()
+        answer = self.local_answer(question)
+        if answer is not None:
+            self.local_answers += 1
+        else:
+            answer = self._send(f"Please answer the following question:\n\n{question}", stage='question')
+        self._remember(question, answer)
+        return answer
+
+    def refine(self, feedback):
+        request = f"Please refine the analysis based on the following feedback:\n\n{feedback.strip()}"
+        answer = self._send(request, stage='refine')
+        self._remember(request, answer)
+        return answer
+
+    def _remember(self, question, answer):
+        self.turns.append((question, answer))
+        if len(self.turns) > self.max_turns:
+            # Dropping the oldest turn changes the prefix, so the next call rewrites the cache once
+            self.turns = self.turns[-self.max_turns:]
+
+    def _send(self, request, stage):
+        with self.engine._telemetry_scope(
+            project=self.project_name, stage=stage, unit=self.engine._interview_unit(self.interview)
+        ):
+            response = self.engine._create_message(self.messages(request), self.bypass_cache)
+        self.llm_calls += 1
+        return response
+
+    def prefix(self):
+        if self._prefix is None:
+            blocks = []
+            if self.vtt_content:
+                blocks = self.engine._transcript_prefix(self.engine.prompt_transcript(self.vtt_content))
+            blocks.append({
+                "type": "text",
+                "text": f"Here's the stored analysis of this interview:\n\n{self.format_results()}",
+                "cache_control": {"type": "ephemeral"}
+            })
+            self._prefix = blocks
+        return self._prefix
+
+    def messages(self, request) -> List[Dict]:
+        # Only the newest user turn carries a cache marker next to the two on the
+        # prefix, which keeps the request within the provider's four breakpoints.
+        messages = []
+        pending = list(self.prefix())
+        for question, answer in self.turns:
+            messages.append({"role": "user", "content": pending + [{"type": "text", "text": question}]})
+            messages.append({"role": "assistant", "content": answer})
+            pending = []
+        messages.append({
+            "role": "user",
+            "content": pending + [{"type": "text", "text": request, "cache_control": {"type": "ephemeral"}}]
+        })
+        return messages
+
+    def format_results(self):
+        if not self.results:
+            return "No analysis results are stored for this interview."
+        sections = []
+        for result in self.results:
+            lines = [result['learning_goal'], f"Answer: {result['answer']}", f"Confidence: {result['confidence']}"]
+            for evidence in result.get('evidence', []):
+                lines.append(f"- [{evidence.get('timestamp', 'N/A')}] \"{evidence['quote']}\" {evidence.get('explanation', '')}".rstrip())
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
+    def local_answer(self, question) -> Optional[str]:
+        lowered = question.lower()
+        if not self.results or any(word not in LOOKUP_WORDS for word in LOOKUP_WORD.findall(GOAL_REFERENCE.sub(' ', lowered))):
+            return None
+        goals = [int(number) for number in GOAL_REFERENCE.findall(question)]
+        if any(goal not in self.results_by_goal for goal in goals):
+            return None
+        selected = [self.results_by_goal[goal] for goal in goals] or self.results
+        asks_count = 'how many' in lowered or 'number of' in lowered
+        asks_evidence = re.search(r'\b(quotes?|evidence)\b', lowered) is not None
+
+        if asks_count and asks_evidence:
+            return "\n".join(
+                f"{result['learning_goal']}: {len(result.get('evidence', []))} quote(s)" for result in selected
+            ) + ("" if goals else f"\nTotal: {sum(len(result.get('evidence', [])) for result in selected)} quote(s)")
+        if asks_count and re.search(r'\bgoals?\b', lowered) and not goals:
+            level = CONFIDENCE_LEVEL.search(question)
+            if level and 'confidence' in lowered:
+                matching = [result for result in self.results if result['confidence'].lower() == level.group(1).lower()]
+                return f"{len(matching)} of {len(self.results)} learning goals have {level.group(1).capitalize()} confidence."
+            return f"The analysis covers {len(self.results)} learning goals."
+        if 'confidence' in lowered:
+            level = CONFIDENCE_LEVEL.search(question)
+            if level and not goals and re.search(r'\b(which|list|what)\b', lowered):
+                matching = [result['learning_goal'] for result in self.results
+                            if result['confidence'].lower() == level.group(1).lower()]
+                return "\n".join(matching) if matching else f"No learning goals have {level.group(1).capitalize()} confidence."
+            if not level:
+                return "\n".join(f"{result['learning_goal']}: {result['confidence']}" for result in selected)
+            return None
+        # Only a plain request for the quotes; "which quote ..." picks one and goes to the model
+        if asks_evidence and goals and re.match(r"\s*(list|show|give|display|print|what are|what were)\b", lowered):
+            lines = []
+            for result in selected:
+                lines.append(result['learning_goal'])
+                for evidence in result.get('evidence', []):
+                    lines.append(f"- [{evidence.get('timestamp', 'N/A')}] \"{evidence['quote']}\"")
+            return "\n".join(lines)
+        if re.search(r'\banswer\b', lowered) and goals and re.match(r'\s*(what|show|give|list|tell)\b', lowered):
+            return "\n\n".join(f"{result['learning_goal']}\n{result['answer']}" for result in selected)
+        return None
@@ -0,0 +1,126 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+THROTTLE_STATUS_CODES = {429, 529}
+RETRYABLE_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError'}
+
+
+def is_retryable(error):
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def is_throttle(error):
+    return getattr(error, 'status_code', None) in THROTTLE_STATUS_CODES
+
+
+def retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Additive-increase / multiplicative-decrease limit on concurrent LLM calls.
+# Throttling responses (429/529) halve the limit; each success grows it by
+# 1/limit, so it climbs back by roughly one slot per round of calls.
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial_limit, minimum=1, maximum=None, decrease_factor=0.5, cooldown=1.0, clock=time.monotonic):
+        self.maximum = maximum or initial_limit
+        self.minimum = minimum
+        self.limit = float(max(minimum, min(initial_limit, self.maximum)))
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self._clock = clock
+        self._in_flight = 0
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self):
+        with self._condition:
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            now = self._clock()
+            # One burst of throttled responses counts as a single congestion signal
+            if self._last_decrease is not None and now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+            logging.info(f"LLM concurrency reduced to {int(self.limit)} after throttling")
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=6, base_delay=1.0, max_delay=60.0, sleep=time.sleep):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+
+    def delay(self, attempt, error=None):
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        server_delay = retry_after(error) if error is not None else None
+        if server_delay is not None:
+            delay = max(delay, min(server_delay, self.max_delay))
+        return delay
+
+    def call(self, fn, limiter=None, can_retry=None, on_retry=None):
+        attempt = 1
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                if limiter and is_throttle(e):
+                    limiter.on_throttle()
+                retryable = is_retryable(e) and (can_retry is None or can_retry())
+                if not retryable or attempt >= self.max_attempts:
+                    raise
+                delay = self.delay(attempt, e)
+                logging.warning(f"LLM call failed ({str(e)}); retrying in {delay:.1f}s (attempt {attempt + 1} of {self.max_attempts})")
+                if on_retry:
+                    on_retry(attempt, e)
+                self._sleep(delay)
+                attempt += 1
+                continue
+            if limiter:
+                limiter.on_success()
+            return result
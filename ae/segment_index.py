@@ -0,0 +1,106 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9'-]*")
+STOPWORDS = {
+    'a', 'about', 'all', 'also', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'been', 'but', 'by', 'can',
+    'could', 'did', 'do', 'does', 'doing', 'for', 'from', 'had', 'has', 'have', 'how', 'i', 'if', 'in',
+    'into', 'is', 'it', "it's", 'its', 'just', 'like', 'me', 'my', 'no', 'not', 'of', 'on', 'or', 'our',
+    'so', 'some', 'that', "that's", 'the', 'their', 'them', 'then', 'there', 'these', 'they', 'this',
+    'to', 'too', 'um', 'uh', 'was', 'we', 'were', 'what', 'when', 'where', 'which', 'who', 'why', 'will',
+    'with', 'would', 'yeah', 'yes', 'you', 'your'
+}
+
+
+def _stem(word):
+    # Light suffix stripping so "tools"/"tool" and "using"/"used"/"use" meet
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [_stem(word) for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+# Okapi BM25 over a fixed list of segments (speaker turns). Postings lists keep
+# scoring proportional to the number of segments containing the query terms.
+class BM25Index:
+    def __init__(self, segments: List[str], k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(segments)
+        self.lengths = []
+        self.postings = defaultdict(list)
+        for position, segment in enumerate(segments):
+            terms = tokenize(segment)
+            self.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((position, frequency))
+        self.average_length = (sum(self.lengths) / self.size) if self.size else 0.0
+
+    def idf(self, term):
+        document_frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (self.size - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def scores(self, query) -> List[float]:
+        scores = [0.0] * self.size
+        if not self.size:
+            return scores
+        for term in set(tokenize(query)):
+            idf = self.idf(term)
+            for position, frequency in self.postings.get(term, ()):
+                length_norm = 1 - self.b + self.b * self.lengths[position] / (self.average_length or 1)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return scores
+
+
+# Picks the speaker turns worth sending for a set of learning goals: the top-k
+# turns per goal plus the turns just before them (usually the question). Returns
+# None when retrieval is unlikely to be faithful, so the caller sends the full
+# transcript instead:
+# - a goal matches no turn at all;
+# - the top-k turns hold less than recall_threshold of a goal's total BM25 score
+#   (the topic is spread across the conversation);
+# - the selection would cover more than max_fraction of the transcript anyway.
+class SegmentRetriever:
+    def __init__(self, top_k=8, recall_threshold=0.5, context_turns=1, max_fraction=0.6):
+        self.top_k = max(1, top_k)
+        self.recall_threshold = recall_threshold
+        self.context_turns = max(0, context_turns)
+        self.max_fraction = max_fraction
+
+    def settings(self):
+        return {
+            'top_k': self.top_k,
+            'recall_threshold': self.recall_threshold,
+            'context_turns': self.context_turns,
+            'max_fraction': self.max_fraction
+        }
+
+    def select(self, segments: List[str], queries: List[str]) -> Optional[List[int]]:
+        if not segments or not queries:
+            return None
+        index = BM25Index(segments)
+        selected = set()
+        for query in queries:
+            ranked = sorted(
+                ((score, position) for position, score in enumerate(index.scores(query)) if score > 0),
+                reverse=True
+            )
+            if not ranked:
+                return None
+            top = ranked[:self.top_k]
+            recall = sum(score for score, _ in top) / sum(score for score, _ in ranked)
+            if recall < self.recall_threshold:
+                return None
+            for _, position in top:
+                selected.update(range(max(0, position - self.context_turns), position + 1))
+
+        selected_size = sum(len(segments[position]) for position in selected)
+        if selected_size > self.max_fraction * sum(len(segment) for segment in segments):
+            return None
+        return sorted(selected)
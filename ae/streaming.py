@@ -0,0 +1,28 @@
+import re
+
+GOAL_NUMBER = re.compile(r'\[Learning Goal (\d+)')
+
+
+def goal_number(learning_goal_label):
+    match = GOAL_NUMBER.match(learning_goal_label.strip())
+    return int(match.group(1)) if match else None
+
+
+# Splits streamed text into complete lines and hands each one to parse_line
+# as soon as its newline arrives; the final line is parsed when the stream ends.
+class JsonLinesParser:
+    def __init__(self, parse_line):
+        self._parse_line = parse_line
+        self._buffer = ''
+
+    def feed(self, text):
+        self._buffer += text
+        if '\n' not in text:
+            return []
+        lines = self._buffer.split('\n')
+        self._buffer = lines.pop()
+        return [result for line in lines if line.strip() for result in self._parse_line(line)]
+
+    def close(self):
+        remaining, self._buffer = self._buffer, ''
+        return self._parse_line(remaining) if remaining.strip() else []
@@ -0,0 +1,210 @@
+import json
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+ANALYSIS_CONFIDENCE_LEVELS = ('High', 'Medium', 'Low')
+
+
+def _evidence_schema(properties):
+    return {
+        'type': 'array',
+        'items': {
+            'type': 'object',
+            'properties': {name: {'type': 'string'} for name in properties},
+            'required': list(properties)
+        }
+    }
+
+
+ANALYSIS_TOOL = {
+    'name': 'record_interview_analysis',
+    'description': 'Record the answer, evidence and confidence for every learning goal of one interview.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'results': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'goal': {'type': 'integer', 'description': 'Number of the learning goal'},
+                        'answer': {'type': 'string'},
+                        'evidence': _evidence_schema(['timestamp', 'quote', 'explanation']),
+                        'confidence': {'type': 'string', 'enum': list(ANALYSIS_CONFIDENCE_LEVELS)}
+                    },
+                    'required': ['goal', 'answer', 'evidence', 'confidence']
+                }
+            }
+        },
+        'required': ['results']
+    }
+}
+
+META_ANALYSIS_TOOL = {
+    'name': 'record_meta_analysis',
+    'description': 'Record the synthesized answer, evidence and confidence for each learning goal across interviews.',
+    'input_schema': {
+        'type': 'object',
+        'properties': {
+            'results': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'goal': {'type': 'integer', 'description': 'Number of the learning goal'},
+                        'answer': {'type': 'string'},
+                        'evidence': _evidence_schema(['quote', 'context', 'explanation']),
+                        'confidence': {'type': 'integer', 'minimum': 0, 'maximum': 100}
+                    },
+                    'required': ['goal', 'answer', 'evidence', 'confidence']
+                }
+            }
+        },
+        'required': ['results']
+    }
+}
+
+
+class StructuredOutputError(ValueError):
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("; ".join(problems))
+
+
+@dataclass
+class Evidence:
+    quote: str
+    timestamp: str = 'N/A'
+    context: str = ''
+    explanation: str = ''
+
+
+@dataclass
+class GoalResult:
+    goal: int
+    learning_goal: str
+    answer: str
+    confidence: str
+    evidence: List[Evidence] = field(default_factory=list)
+
+    def to_dict(self):
+        # Same shape the text parsers produced, so stored results and reports are unchanged
+        return {
+            'learning_goal': self.learning_goal,
+            'answer': self.answer,
+            'evidence': [asdict(evidence) for evidence in self.evidence],
+            'confidence': self.confidence
+        }
+
+
+def response_text(message):
+    # Tool input is returned as JSON text so it can be cached like any other response
+    for block in message.content:
+        if getattr(block, 'type', None) == 'tool_use':
+            return json.dumps(block.input, ensure_ascii=False)
+    return "".join(getattr(block, 'text', '') for block in message.content)
+
+
+def load_payload(text):
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        # Tolerate prose or a code fence around the JSON object
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            raise StructuredOutputError(["Response is not a JSON object."])
+        try:
+            payload = json.loads(text[start:end + 1])
+        except ValueError as e:
+            raise StructuredOutputError([f"Response is not valid JSON: {str(e)}"])
+    if not isinstance(payload, dict):
+        raise StructuredOutputError(["Response is not a JSON object."])
+    return payload
+
+
+# Validates tool input against the expected learning goals in a single pass and
+# builds typed results. Every problem is collected so one repair request can
+# address all of them.
+class ResultValidator:
+    def __init__(self, meta=False):
+        self.meta = meta
+
+    def label(self, goal):
+        if self.meta:
+            return f"[Learning Goal {goal['index']}]"
+        return f"[Learning Goal {goal['index']}: {goal['content']}]"
+
+    def validate(self, payload, goals, require_all=True) -> List[GoalResult]:
+        problems = []
+        goals_by_index = {goal['index']: goal for goal in goals}
+        entries = payload.get('results')
+        if not isinstance(entries, list):
+            raise StructuredOutputError(["'results' must be a list."])
+
+        results = {}
+        for position, entry in enumerate(entries, 1):
+            result = self.validate_entry(entry, goals_by_index, problems, f"results[{position}]")
+            if result is None:
+                continue
+            if result.goal in results:
+                problems.append(f"Learning goal {result.goal} appears more than once.")
+                continue
+            results[result.goal] = result
+
+        if require_all:
+            missing = [str(index) for index in goals_by_index if index not in results]
+            if missing:
+                problems.append(f"Missing results for learning goal(s) {', '.join(missing)}.")
+        if problems:
+            raise StructuredOutputError(problems)
+        return [results[index] for index in goals_by_index if index in results]
+
+    def validate_entry(self, entry, goals_by_index, problems, where) -> Optional[GoalResult]:
+        if not isinstance(entry, dict):
+            problems.append(f"{where} must be an object.")
+            return None
+        goal_index = entry.get('goal')
+        if isinstance(goal_index, str) and goal_index.strip().isdigit():
+            goal_index = int(goal_index)
+        if goal_index not in goals_by_index:
+            problems.append(f"{where}: 'goal' must be one of {sorted(goals_by_index)}.")
+            return None
+
+        answer = entry.get('answer')
+        if not isinstance(answer, str) or not answer.strip():
+            problems.append(f"{where}: 'answer' must be a non-empty string.")
+            return None
+
+        confidence = self.validate_confidence(entry.get('confidence'))
+        if confidence is None:
+            allowed = "an integer from 0 to 100" if self.meta else f"one of {', '.join(ANALYSIS_CONFIDENCE_LEVELS)}"
+            problems.append(f"{where}: 'confidence' must be {allowed}.")
+            return None
+
+        evidence = []
+        for number, item in enumerate(entry.get('evidence') or [], 1):
+            if not isinstance(item, dict) or not isinstance(item.get('quote'), str) or not item['quote'].strip():
+                problems.append(f"{where}.evidence[{number}] must have a non-empty 'quote'.")
+                return None
+            evidence.append(Evidence(
+                quote=item['quote'].strip(),
+                timestamp=str(item.get('timestamp') or 'N/A').strip(),
+                context=str(item.get('context') or '').strip(),
+                explanation=str(item.get('explanation') or '').strip()
+            ))
+
+        return GoalResult(goal_index, self.label(goals_by_index[goal_index]), answer.strip(), confidence, evidence)
+
+    def validate_confidence(self, confidence):
+        if self.meta:
+            if isinstance(confidence, str) and confidence.strip().isdigit():
+                confidence = int(confidence)
+            if isinstance(confidence, bool) or not isinstance(confidence, int) or not 0 <= confidence <= 100:
+                return None
+            return str(confidence)
+        if not isinstance(confidence, str):
+            return None
+        for level in ANALYSIS_CONFIDENCE_LEVELS:
+            if confidence.strip().lower() == level.lower():
+                return level
+        return None
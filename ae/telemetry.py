@@ -0,0 +1,125 @@
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+# USD per million tokens (input, output), matched by model-name prefix.
+# Cache writes cost 1.25x and cache reads 0.1x the input price.
+MODEL_PRICES = OrderedDict([
+    ('claude-3-5-sonnet', (3.0, 15.0)),
+    ('claude-3-7-sonnet', (3.0, 15.0)),
+    ('claude-sonnet-4', (3.0, 15.0)),
+    ('claude-3-5-haiku', (0.8, 4.0)),
+    ('claude-3-haiku', (0.25, 1.25)),
+    ('claude-3-opus', (15.0, 75.0)),
+    ('claude-opus-4', (15.0, 75.0)),
+])
+
+
+def estimate_cost(model, input_tokens, output_tokens, cache_creation_tokens=0, cache_read_tokens=0):
+    for prefix, (input_price, output_price) in MODEL_PRICES.items():
+        if model and model.startswith(prefix):
+            return (
+                input_tokens * input_price
+                + cache_creation_tokens * input_price * 1.25
+                + cache_read_tokens * input_price * 0.1
+                + output_tokens * output_price
+            ) / 1_000_000
+    return None
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# Append-only JSON lines ledger with one entry per LLM call. Writes are
+# serialized with a lock and each entry is a single line, so concurrent
+# workers never interleave and an interrupted run leaves a readable file.
+class TelemetryLedger:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def scope(self):
+        return dict(getattr(self._local, 'scope', {}))
+
+    @contextmanager
+    def scoped(self, **fields):
+        # Fields (project, run, stage, unit, ...) attached to every call made in this thread
+        previous = getattr(self._local, 'scope', {})
+        self._local.scope = dict(previous, **fields)
+        try:
+            yield
+        finally:
+            self._local.scope = previous
+
+    def record(self, **fields):
+        entry = dict(self.scope(), **fields)
+        entry['at'] = datetime.now().isoformat()
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        return entry
+
+    def entries(self, project_name=None):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if project_name is None or entry.get('project') == project_name:
+                    yield entry
+
+
+def summarize(entries):
+    # Aggregates ledger entries per run, then per stage within each run
+    runs = OrderedDict()
+    for entry in entries:
+        run = runs.setdefault(entry.get('run') or 'no run', {'started': entry.get('at'), 'stages': OrderedDict()})
+        stage = run['stages'].setdefault(entry.get('stage') or 'other', {
+            'calls': 0, 'cached': 0, 'errors': 0, 'retries': 0, 'repairs': 0, 'latencies': [],
+            'input_tokens': 0, 'output_tokens': 0, 'cache_read_input_tokens': 0,
+            'cache_creation_input_tokens': 0, 'cost_usd': 0.0, 'priced': True
+        })
+        stage['calls'] += 1
+        stage['retries'] += entry.get('retries', 0)
+        if entry.get('repair'):
+            stage['repairs'] += 1
+        if entry.get('outcome') == 'cached':
+            stage['cached'] += 1
+            continue
+        if entry.get('outcome') == 'error':
+            stage['errors'] += 1
+        for field in ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens'):
+            stage[field] += entry.get(field) or 0
+        if entry.get('latency_s') is not None and entry.get('outcome') == 'ok':
+            stage['latencies'].append(entry['latency_s'])
+        if entry.get('cost_usd') is not None:
+            stage['cost_usd'] += entry['cost_usd']
+        elif entry.get('outcome') != 'error':
+            stage['priced'] = False
+
+    for run in runs.values():
+        for stage in run['stages'].values():
+            latencies = stage.pop('latencies')
+            stage['p50_latency_s'] = percentile(latencies, 0.50)
+            stage['p95_latency_s'] = percentile(latencies, 0.95)
+            total_latency = sum(latencies)
+            stage['output_tokens_per_s'] = stage['output_tokens'] / total_latency if total_latency else None
+            if not stage.pop('priced'):
+                stage['cost_usd'] = None
+    return runs
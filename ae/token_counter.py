@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import math
+import threading
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# Offline token counting memoized by content hash. The characters-per-token
+# ratio starts at a conservative default and is calibrated against a handful
+# of real counts from the API; everything else is estimated locally.
+class TokenCounter:
+    def __init__(self, client=None, model=None, chars_per_token=3.5, samples=0,
+                 sample_chars=0, sample_tokens=0, max_calibration_samples=5, client_provider=None):
+        self._client = client
+        self._client_provider = client_provider
+        self.model = model
+        self.chars_per_token = chars_per_token
+        self.samples = samples
+        self.sample_chars = sample_chars
+        self.sample_tokens = sample_tokens
+        self.max_calibration_samples = max_calibration_samples
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # A provider defers creating the API client until a real count is needed
+        if self._client is None and self._client_provider is not None:
+            self._client = self._client_provider()
+        return self._client
+
+    def estimate(self, text):
+        if not text:
+            return 0
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count(self, text):
+        if not text:
+            return 0
+        key = content_hash(text)
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached is not None:
+            return cached
+        tokens = self.estimate(text)
+        with self._lock:
+            self._counts[key] = tokens
+        return tokens
+
+    def seed(self, text_hash, tokens):
+        with self._lock:
+            self._counts.setdefault(text_hash, tokens)
+
+    def needs_calibration(self):
+        return self.client is not None and self.samples < self.max_calibration_samples
+
+    def calibrate(self, text):
+        if not text or not self.needs_calibration():
+            return self.count(text)
+        try:
+            tokens = self._count_remote(text)
+        except Exception as e:
+            logging.warning(f"Token count calibration failed, using local estimate: {str(e)}")
+            return self.count(text)
+        with self._lock:
+            self.samples += 1
+            self.sample_chars += len(text)
+            self.sample_tokens += tokens
+            if self.sample_tokens:
+                self.chars_per_token = self.sample_chars / self.sample_tokens
+            self._counts[content_hash(text)] = tokens
+        return tokens
+
+    def _count_remote(self, text):
+        messages = getattr(self.client, 'messages', None)
+        if messages is not None and hasattr(messages, 'count_tokens'):
+            result = messages.count_tokens(model=self.model, messages=[{"role": "user", "content": text}])
+            return result.input_tokens
+        return self.client.count_tokens(text)
+
+    def calibration(self):
+        with self._lock:
+            return {
+                'chars_per_token': self.chars_per_token,
+                'samples': self.samples,
+                'sample_chars': self.sample_chars,
+                'sample_tokens': self.sample_tokens
+            }
@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+import urllib.parse
+from collections import OrderedDict
+
+
+# Single reader for project VTT transcripts, shared by the analysis engine and
+# the project manager. Decoded transcripts are kept in an LRU cache bounded by
+# their size on disk; an entry is reused only while the file's mtime and size
+# are unchanged, so re-imported transcripts are picked up on the next read.
+class TranscriptStore:
+    def __init__(self, base_dir=None, max_bytes=64 * 1024 * 1024):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def path(self, project_name, vtt_filename):
+        base_dir = self.base_dir or os.path.join(os.getcwd(), "project_data")
+        return os.path.join(base_dir, project_name, "vtt", urllib.parse.unquote(vtt_filename))
+
+    def get(self, project_name, vtt_filename):
+        vtt_path = self.path(project_name, vtt_filename)
+        try:
+            stat = os.stat(vtt_path)
+        except FileNotFoundError:
+            logging.error(f"VTT file not found: {vtt_path}")
+            return None
+        except OSError as e:
+            logging.error(f"Error reading VTT file {vtt_path}: {str(e)}")
+            return None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(vtt_path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(vtt_path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        try:
+            with open(vtt_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+        except FileNotFoundError:
+            logging.error(f"VTT file not found: {vtt_path}")
+            return None
+        except Exception as e:
+            logging.error(f"Error reading VTT file {vtt_path}: {str(e)}")
+            return None
+        self._store(vtt_path, version, content)
+        return content
+
+    def _store(self, vtt_path, version, content):
+        size = version[1]
+        with self._lock:
+            previous = self._entries.pop(vtt_path, None)
+            if previous is not None:
+                self._total_bytes -= previous[0][1]
+            if size > self.max_bytes:
+                return
+            self._entries[vtt_path] = (version, content)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (evicted_version, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_version[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
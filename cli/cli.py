@@ -7,10 +7,10 @@ from reporting_engine.engine import ReportingEngine
 from ppe.ppe import PreprocessorEngine
 
 def interactive_cli(plm, ppe, ae, project_name, project_config):
-    re = ReportingEngine()
+    re = ReportingEngine(plm.data_manager)
     click.echo(f"Welcome to QR-AI Interactive CLI! Current project: {project_name}")
     
-    commands = ['set_learning_goal', 'show_learning_goals', 'import', 'set_interview', 'associate_file', 'status', 'analyze', 'meta_analyze', 'report', 'help', 'exit', 'discover_entities']
+    commands = ['set_learning_goal', 'show_learning_goals', 'import', 'set_interview', 'associate_file', 'status', 'analyze', 'meta_analyze', 'report', 'help', 'exit', 'discover_entities', 'cache_stats', 'batch_submit', 'batch_status', 'batch_collect', 'resume', 'token_report', 'stats', 'ask']
     command_completer = WordCompleter(commands, ignore_case=True)
     session = PromptSession(completer=command_completer)
 
@@ -58,6 +58,10 @@ def interactive_cli(plm, ppe, ae, project_name, project_config):
             plm.table_status(project_name)
         elif command.startswith('analyze'):
             parts = command.split()
+            bypass_cache = '--no-cache' in parts
+            force = '--force' in parts
+            stream = True if '--stream' in parts else None
+            parts = [part for part in parts if part not in ('--no-cache', '--force', '--stream')]
             if len(parts) > 1:
                 argument = parts[1]
             else:
@@ -80,10 +84,17 @@ def interactive_cli(plm, ppe, ae, project_name, project_config):
                 else:
                     continue
             
-            ae.analyze_interviews(project_name, argument)
-        elif command == 'report':
+            ae.bypass_cache = bypass_cache
             try:
-                output_file = re.generate_webpage(project_name)
+                ae.analyze_interviews(project_name, argument, force=force, stream=stream)
+            finally:
+                ae.bypass_cache = False
+        elif command.startswith('report'):
+            try:
+                if '--paged' in command.split():
+                    output_file = re.generate_paged_report(project_name)
+                else:
+                    output_file = re.generate_webpage(project_name)
                 click.echo(f"Generated report: {output_file}")
                 webbrowser.open('file://' + os.path.abspath(output_file))
                 click.echo("The report has been opened in your default web browser.")
@@ -105,6 +116,94 @@ def interactive_cli(plm, ppe, ae, project_name, project_config):
                 click.echo(f"Error during meta-analysis: {str(e)}")
             except Exception as e:
                 click.echo(f"An unexpected error occurred during meta-analysis: {str(e)}")
+        elif command.startswith('batch_submit'):
+            parts = command.split()
+            force = '--force' in parts
+            parts = [part for part in parts if part != '--force']
+            kind = parts[1] if len(parts) > 1 else 'analyze'
+            if kind not in ('analyze', 'meta'):
+                click.echo("Usage: batch_submit [analyze [all|<index>] | meta] [--force]")
+                continue
+            argument = parts[2] if len(parts) > 2 else 'all'
+            try:
+                plm.batch_submit(project_name, kind, argument, force)
+            except Exception as e:
+                click.echo(f"An error occurred while submitting the batch: {str(e)}")
+        elif command == 'batch_status':
+            try:
+                plm.batch_status(project_name)
+            except Exception as e:
+                click.echo(f"An error occurred while checking batch status: {str(e)}")
+        elif command == 'batch_collect':
+            try:
+                plm.batch_collect(project_name)
+            except Exception as e:
+                click.echo(f"An error occurred while collecting batch results: {str(e)}")
+        elif command == 'resume':
+            try:
+                ae.resume(project_name)
+            except Exception as e:
+                click.echo(f"An error occurred while resuming the job: {str(e)}")
+        elif command.startswith('stats'):
+            parts = command.split()
+            try:
+                plm.stats(project_name, parts[1] if len(parts) > 1 else None)
+            except Exception as e:
+                click.echo(f"An error occurred while reading LLM call statistics: {str(e)}")
+        elif command.startswith('ask'):
+            parts = command.split()
+            bypass_cache = '--no-cache' in parts
+            parts = [part for part in parts if part != '--no-cache']
+            if len(parts) < 2 or not parts[1].isdigit():
+                click.echo("Usage: ask <interview index> [--no-cache]")
+                continue
+            try:
+                qa = ae.qa_session(project_name, parts[1], bypass_cache=bypass_cache)
+            except Exception as e:
+                click.echo(f"Unable to start a Q&A session: {str(e)}")
+                continue
+            click.echo("Ask questions about this interview. Start a line with 'refine' to give feedback on the analysis. Enter an empty line to finish.")
+            while True:
+                try:
+                    question = session.prompt("question> ").strip()
+                except (KeyboardInterrupt, EOFError):
+                    break
+                if not question or question.lower() in ('exit', 'done'):
+                    break
+                local_answers = qa.local_answers
+                try:
+                    if question.lower().startswith('refine '):
+                        answer = qa.refine(question[len('refine '):])
+                    else:
+                        answer = qa.ask(question)
+                except Exception as e:
+                    click.echo(f"Error while answering question: {str(e)}")
+                    continue
+                click.echo(answer)
+                if qa.local_answers > local_answers:
+                    click.echo("(answered from the stored analysis)")
+            click.echo(f"Session finished: {qa.llm_calls} LLM call(s), {qa.local_answers} answer(s) from stored results.")
+        elif command == 'token_report':
+            try:
+                plm.token_report(project_name)
+            except Exception as e:
+                click.echo(f"An error occurred while building the token report: {str(e)}")
+        elif command == 'cache_stats':
+            stats = ae.cache_stats()
+            if stats is None:
+                click.echo("The LLM response cache is disabled.")
+            else:
+                click.echo(f"Cache hits: {stats['hits']}")
+                click.echo(f"Cache misses: {stats['misses']}")
+                click.echo(f"Cached responses: {stats['entries']} ({stats['bytes'] / (1024 * 1024):.1f} MB)")
+            usage = ae.usage_stats()
+            click.echo(f"Prompt cache reads this session: {usage['cache_read_input_tokens']} tokens")
+            click.echo(f"Prompt cache writes this session: {usage['cache_creation_input_tokens']} tokens")
+            click.echo(f"Uncached input tokens this session: {usage['input_tokens']}")
+            transcripts = ae.transcript_store.stats()
+            click.echo(f"Transcript cache hits: {transcripts['hits']}, misses: {transcripts['misses']} "
+                       f"({transcripts['entries']} transcripts, {transcripts['bytes'] / (1024 * 1024):.1f} of "
+                       f"{transcripts['max_bytes'] / (1024 * 1024):.0f} MB)")
         elif command == 'discover_entities':
             try:
                 plm.status(project_name)
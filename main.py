@@ -5,8 +5,8 @@ import sys
 from cli.cli import interactive_cli
 from plm.plm import ProjectLifecycleManager
 from ppe.ppe import PreprocessorEngine
-from ae.ae import AnalysisEngine
 from reporting_engine.engine import ReportingEngine
+from ae.llm_client import close_shared_clients
 from ppe.ppe import PreprocessorEngine
 from rich.console import Console
 from rich.table import Table
@@ -34,8 +34,8 @@ def main():
         
         plm = ProjectLifecycleManager(data_file_path)
         ppe = PreprocessorEngine()
-        ae = AnalysisEngine(plm.data_manager, plm.anthropic_api_key, plm.anthropic_max_tokens)
-        re = ReportingEngine()
+        ae = plm.ae
+        re = ReportingEngine(plm.data_manager)
 
         logger.info("Checking for existing project")
         project_name = plm.get_project(current_dir)
@@ -73,6 +73,9 @@ def main():
         else:
             print("Run with --debug flag for more detailed error information.")
         sys.exit(1)
+    finally:
+        # Closes pooled keep-alive connections before the process exits
+        close_shared_clients()
 
 if __name__ == "__main__":
     main()
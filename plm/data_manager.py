@@ -250,12 +250,27 @@ class DataManager:
                     return [interview for interview in project.get("interviews", []) if interview["index"] == int(interview_index)]
         return []
 
-    def save_analysis_results(self, project_name, interview_index, analysis_results):
+    def save_analysis_results(self, project_name, interview_index, analysis_results, fingerprint=None):
         for project in self.data["projects"]:
             if project["name"] == project_name:
                 for interview in project["interviews"]:
                     if interview["index"] == interview_index:
                         interview["analysis_results"] = json.loads(json.dumps(analysis_results))
+                        if fingerprint is not None:
+                            interview["analysis_fingerprint"] = fingerprint
+                        else:
+                            interview.pop("analysis_fingerprint", None)
+                        interview.pop("partial_analysis", None)
+                        self._save_data()
+                        return True
+        return False
+
+    def save_partial_analysis(self, project_name, interview_index, partial_analysis):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                for interview in project["interviews"]:
+                    if interview["index"] == interview_index:
+                        interview["partial_analysis"] = json.loads(json.dumps(partial_analysis))
                         self._save_data()
                         return True
         return False
@@ -273,3 +288,56 @@ class DataManager:
             if project["name"] == project_name:
                 return project.get('meta_analysis', None)
         return None
+
+    def get_meta_analysis_chunks(self, project_name):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                return project.get('meta_analysis_chunks', {})
+        return {}
+
+    def save_meta_analysis_chunks(self, project_name, chunk_results, chunk_parts=None):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                project['meta_analysis_chunks'] = chunk_results
+                if chunk_parts is not None:
+                    project['meta_analysis_chunk_parts'] = chunk_parts
+                self._save_data()
+                return True
+        return False
+
+    def get_meta_analysis_chunk_parts(self, project_name):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                return project.get('meta_analysis_chunk_parts', {})
+        return {}
+
+    def get_token_calibration(self):
+        return self.data.get("token_calibration", {})
+
+    def save_token_calibration(self, calibration):
+        self.data["token_calibration"] = calibration
+        self._save_data()
+
+    def get_batch_jobs(self, project_name):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                return project.get('batch_jobs', [])
+        return []
+
+    def add_batch_job(self, project_name, job):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                project.setdefault('batch_jobs', []).append(job)
+                self._save_data()
+                return True
+        return False
+
+    def update_batch_job(self, project_name, job_id, job_data):
+        for project in self.data["projects"]:
+            if project["name"] == project_name:
+                for job in project.get('batch_jobs', []):
+                    if job['id'] == job_id:
+                        job.update(job_data)
+                        self._save_data()
+                        return job
+        return None
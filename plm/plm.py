@@ -2,7 +2,15 @@ import os
 import configparser
 from .data_manager import DataManager
 from ppe.ppe import PreprocessorEngine
+from ppe.compactor import TranscriptCompactor
 from ae.ae import AnalysisEngine
+from ae.retry import RetryPolicy
+from ae.response_cache import ResponseCache
+from ae.token_counter import content_hash
+from ae.batch import BatchJobManager
+from ae.segment_index import SegmentRetriever
+from ae.telemetry import TelemetryLedger, summarize
+from ae.transcript_store import TranscriptStore
 import shutil
 from pydub import AudioSegment
 import glob
@@ -10,7 +18,6 @@ from rich.console import Console
 from rich.table import Table
 from rich.markdown import Markdown
 import urllib.parse
-import logging
 import shutil
 
 class ProjectLifecycleManager:
@@ -30,9 +37,96 @@ class ProjectLifecycleManager:
         self.anthropic_model = self.global_config.get('Anthropic', 'model', fallback='claude-3-5-sonnet-20241022')
         self.anthropic_max_tokens = self.global_config.getint('Anthropic', 'max_tokens', fallback=4000)
         self.anthropic_temperature = self.global_config.getfloat('Anthropic', 'temperature', fallback=0.7)
+        self.anthropic_max_workers = self.global_config.getint('Anthropic', 'max_workers', fallback=4)
+        self.anthropic_requests_per_minute = self.global_config.getint('Anthropic', 'requests_per_minute', fallback=0)
+        self.anthropic_tokens_per_minute = self.global_config.getint('Anthropic', 'tokens_per_minute', fallback=0)
+        self.anthropic_input_token_budget = self.global_config.getint('Anthropic', 'input_token_budget', fallback=150000)
+        self.anthropic_reduce_fanout = self.global_config.getint('Anthropic', 'reduce_fanout', fallback=8)
+        self.anthropic_stream = self.global_config.getboolean('Anthropic', 'stream', fallback=False)
+        self.anthropic_max_repair_attempts = self.global_config.getint('Anthropic', 'max_repair_attempts', fallback=2)
+        self.anthropic_base_url = self.global_config.get('Anthropic', 'base_url', fallback=None) or None
+        self.anthropic_timeout = self.global_config.getfloat('Anthropic', 'timeout', fallback=600.0)
+        self.anthropic_connect_timeout = self.global_config.getfloat('Anthropic', 'connect_timeout', fallback=10.0)
+        self.anthropic_max_connections = self.global_config.getint('Anthropic', 'max_connections', fallback=0)
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.global_config.getint('Anthropic', 'max_attempts', fallback=6),
+            base_delay=self.global_config.getfloat('Anthropic', 'retry_base_delay', fallback=1.0),
+            max_delay=self.global_config.getfloat('Anthropic', 'retry_max_delay', fallback=60.0)
+        )
+
+        # Transcripts are compacted before they are sent in prompts only when [Compaction] enabled is set
+        self.compactor = None
+        if self.global_config.getboolean('Compaction', 'enabled', fallback=False):
+            self.compactor = TranscriptCompactor(
+                speaker_aliases=self.global_config.getboolean('Compaction', 'speaker_aliases', fallback=True),
+                strip_fillers=self.global_config.getboolean('Compaction', 'strip_fillers', fallback=True),
+                timestamps=self.global_config.getboolean('Compaction', 'timestamps', fallback=True)
+            )
+
+        # Goal-targeted retrieval sends only the relevant speaker turns of each transcript
+        self.retriever = None
+        if self.global_config.getboolean('Retrieval', 'enabled', fallback=False):
+            self.retriever = SegmentRetriever(
+                top_k=self.global_config.getint('Retrieval', 'top_k', fallback=8),
+                recall_threshold=self.global_config.getfloat('Retrieval', 'recall_threshold', fallback=0.5),
+                context_turns=self.global_config.getint('Retrieval', 'context_turns', fallback=1),
+                max_fraction=self.global_config.getfloat('Retrieval', 'max_fraction', fallback=0.6)
+            )
+
+        # Append-only ledger of every LLM call, read by the stats command
+        self.telemetry = None
+        if self.global_config.getboolean('Telemetry', 'enabled', fallback=True):
+            ledger_path = self.global_config.get('Telemetry', 'path', fallback=os.path.join(project_data_dir, 'llm_calls.jsonl'))
+            self.telemetry = TelemetryLedger(ledger_path)
+
+        # Persistent LLM response cache shared by every AnalysisEngine
+        self.response_cache = None
+        if self.global_config.getboolean('Cache', 'enabled', fallback=True):
+            cache_dir = self.global_config.get('Cache', 'directory', fallback=os.path.join(project_data_dir, 'llm_cache'))
+            max_size_mb = self.global_config.getint('Cache', 'max_size_mb', fallback=512)
+            self.response_cache = ResponseCache(cache_dir, max_bytes=max_size_mb * 1024 * 1024)
+
+        # In-memory transcript cache used by every transcript read in this process
+        self.transcript_store = TranscriptStore(
+            max_bytes=self.global_config.getint('TranscriptCache', 'max_size_mb', fallback=64) * 1024 * 1024
+        )
 
         # Initialize AnalysisEngine
-        self.ae = AnalysisEngine(self.data_manager, self.anthropic_api_key, self.anthropic_max_tokens)
+        self.ae = self.create_analysis_engine()
+
+        # Batch submissions go to the provider's message batches API unless configured otherwise
+        batch_backend = self.global_config.get('Anthropic', 'batch_backend', fallback='provider')
+        self.batch_manager = BatchJobManager(
+            self.ae,
+            os.path.join(project_data_dir, 'batches'),
+            use_provider_batches=batch_backend != 'local'
+        )
+
+    def create_analysis_engine(self):
+        return AnalysisEngine(
+            self.data_manager,
+            self.anthropic_api_key,
+            self.anthropic_max_tokens,
+            anthropic_model=self.anthropic_model,
+            anthropic_temperature=self.anthropic_temperature,
+            max_workers=self.anthropic_max_workers,
+            requests_per_minute=self.anthropic_requests_per_minute,
+            tokens_per_minute=self.anthropic_tokens_per_minute,
+            response_cache=self.response_cache,
+            input_token_budget=self.anthropic_input_token_budget,
+            reduce_fanout=self.anthropic_reduce_fanout,
+            stream_responses=self.anthropic_stream,
+            retry_policy=self.retry_policy,
+            compactor=self.compactor,
+            max_repair_attempts=self.anthropic_max_repair_attempts,
+            retriever=self.retriever,
+            telemetry=self.telemetry,
+            base_url=self.anthropic_base_url,
+            request_timeout=self.anthropic_timeout,
+            connect_timeout=self.anthropic_connect_timeout,
+            max_connections=self.anthropic_max_connections or None,
+            transcript_store=self.transcript_store
+        )
 
     def _get_project_config(self, project_dir):
         config = configparser.ConfigParser()
@@ -296,12 +390,19 @@ class ProjectLifecycleManager:
             raw_content = self.get_vtt_content(project_name, vtt_filename)
             if raw_content:
                 processed_content = self.ppe.preprocess_vtt_content(raw_content)
-                raw_tokens = self.ae._estimate_token_count(raw_content)
-                processed_tokens = self.ae._estimate_token_count(processed_content)
+                token_counter = self.ae.token_counter
+                if token_counter.needs_calibration():
+                    # A few real counts calibrate the offline estimator for every later count
+                    raw_tokens = token_counter.calibrate(raw_content)
+                    self.data_manager.save_token_calibration(token_counter.calibration())
+                else:
+                    raw_tokens = token_counter.count(raw_content)
+                processed_tokens = token_counter.count(processed_content)
                 
                 # Save processed content and token counts
                 self.data_manager.update_interview(project_name, interview['name'], {
                     'processed_vtt_content': processed_content,
+                    'transcript_hash': content_hash(raw_content),
                     'raw_tokens': raw_tokens,
                     'processed_tokens': processed_tokens
                 })
@@ -410,25 +511,140 @@ class ProjectLifecycleManager:
         return self.data_manager.get_interview_data(project_name, interview_index)
 
     def get_vtt_content(self, project_name, vtt_filename):
-        project_dir = os.path.join(os.getcwd(), "project_data", project_name)
-        vtt_dir = os.path.join(project_dir, "vtt")
-        # Use urllib.parse.unquote to handle URL-encoded filenames
-        vtt_filename = urllib.parse.unquote(vtt_filename)
-        vtt_path = os.path.join(vtt_dir, vtt_filename)
-        try:
-            with open(vtt_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except FileNotFoundError:
-            logging.error(f"VTT file not found: {vtt_path}")
-            return None
-        except Exception as e:
-            logging.error(f"Error reading VTT file {vtt_path}: {str(e)}")
-            return None
+        return self.transcript_store.get(project_name, vtt_filename)
 
     def perform_meta_analysis(self, project_name):
-        from ae.ae import AnalysisEngine
-        analysis_engine = AnalysisEngine(self.data_manager, self.anthropic_api_key, self.anthropic_max_tokens)
-        return analysis_engine.perform_meta_analysis(project_name)
+        return self.ae.perform_meta_analysis(project_name)
+
+    def batch_submit(self, project_name, kind, argument='all', force=False):
+        if kind == 'meta':
+            job = self.batch_manager.submit_meta_analysis(project_name, force)
+        else:
+            job = self.batch_manager.submit_analysis(project_name, argument, force)
+        if job:
+            print(f"Submitted batch {job['id']} with {len(job['units'])} request(s).")
+            print("Run 'batch_status' to check progress and 'batch_collect' to store the results.")
+        else:
+            print("Nothing to submit: all results are up to date or already waiting in a batch.")
+
+    def token_report(self, project_name):
+        rows = self.ae.compaction_report(
+            project_name,
+            self.data_manager.get_interview_data(project_name),
+            self.data_manager.get_learning_goals(project_name)
+        )
+        if not rows:
+            print("No interview transcripts found.")
+            return
+        console = Console()
+        table = Table(title="Prompt Tokens per Interview", show_header=True, header_style="bold magenta")
+        table.add_column("Index", style="dim", width=5)
+        table.add_column("Name", style="dim", width=20)
+        table.add_column("Raw Tokens", justify="right")
+        table.add_column("Compacted Tokens", justify="right")
+        table.add_column("Prompt Tokens", justify="right")
+        table.add_column("Saved", justify="right")
+        for row in rows:
+            saved = row['saved_tokens'] / row['raw_tokens'] * 100 if row['raw_tokens'] else 0
+            table.add_row(
+                str(row['index']),
+                row['name'],
+                str(row['raw_tokens']),
+                str(row['compacted_tokens']),
+                str(row['prompt_tokens']),
+                f"{row['saved_tokens']} ({saved:.0f}%)"
+            )
+        raw_total = sum(row['raw_tokens'] for row in rows)
+        prompt_total = sum(row['prompt_tokens'] for row in rows)
+        console.print(table)
+        if self.compactor is None and self.retriever is None:
+            console.print("Transcript compaction and retrieval are disabled; prompts use the raw transcripts.")
+        elif raw_total:
+            console.print(f"Total: {raw_total} raw tokens, {prompt_total} sent in analysis prompts "
+                          f"({(raw_total - prompt_total) / raw_total * 100:.0f}% saved)")
+
+    def stats(self, project_name, run_id=None, last_runs=5):
+        if self.telemetry is None:
+            print("Telemetry is disabled.")
+            return
+        runs = summarize(self.telemetry.entries(project_name))
+        if run_id:
+            runs = {run: summary for run, summary in runs.items() if run.startswith(run_id)}
+        else:
+            runs = dict(list(runs.items())[-last_runs:])
+        if not runs:
+            print("No LLM calls recorded for this project.")
+            return
+
+        def seconds(value):
+            return f"{value:.2f}s" if value is not None else '-'
+
+        console = Console()
+        for run, summary in runs.items():
+            table = Table(title=f"Run {run} (started {summary['started']})", show_header=True, header_style="bold magenta")
+            table.add_column("Stage")
+            table.add_column("Calls", justify="right")
+            table.add_column("Cached", justify="right")
+            table.add_column("Errors", justify="right")
+            table.add_column("Retries", justify="right")
+            table.add_column("Repairs", justify="right")
+            table.add_column("p50", justify="right")
+            table.add_column("p95", justify="right")
+            table.add_column("Input Tokens", justify="right")
+            table.add_column("Cache Read", justify="right")
+            table.add_column("Output Tokens", justify="right")
+            table.add_column("Output Tok/s", justify="right")
+            table.add_column("Cost (USD)", justify="right")
+            for stage_name, stage in summary['stages'].items():
+                table.add_row(
+                    stage_name,
+                    str(stage['calls']),
+                    str(stage['cached']),
+                    str(stage['errors']),
+                    str(stage['retries']),
+                    str(stage['repairs']),
+                    seconds(stage['p50_latency_s']),
+                    seconds(stage['p95_latency_s']),
+                    str(stage['input_tokens'] + stage['cache_creation_input_tokens']),
+                    str(stage['cache_read_input_tokens']),
+                    str(stage['output_tokens']),
+                    f"{stage['output_tokens_per_s']:.1f}" if stage['output_tokens_per_s'] is not None else '-',
+                    f"{stage['cost_usd']:.4f}" if stage['cost_usd'] is not None else '-'
+                )
+            console.print(table)
+
+    def batch_status(self, project_name):
+        statuses = self.batch_manager.status(project_name)
+        if not statuses:
+            print("No batch jobs for this project.")
+            return
+        console = Console()
+        table = Table(title="Batch Jobs", show_header=True, header_style="bold magenta")
+        table.add_column("Batch ID")
+        table.add_column("Kind")
+        table.add_column("Submitted")
+        table.add_column("Requests", justify="right")
+        table.add_column("Status")
+        table.add_column("Succeeded", justify="right")
+        table.add_column("Errored", justify="right")
+        for job, counts in statuses:
+            table.add_row(
+                job['id'],
+                job['kind'],
+                job['submitted_at'],
+                str(len(job['units'])),
+                job['status'],
+                str(counts.succeeded) if counts else '',
+                str(counts.errored) if counts else ''
+            )
+        console.print(table)
+
+    def batch_collect(self, project_name):
+        collected = self.batch_manager.collect(project_name)
+        if collected:
+            print(f"Collected results from {len(collected)} batch job(s).")
+        else:
+            print("No finished batch jobs to collect.")
 
     def get_meta_analysis_results(self, project_name):
         return self.data_manager.get_meta_analysis_results(project_name)
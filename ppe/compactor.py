@@ -0,0 +1,210 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+TIMING_PATTERN = re.compile(r'^\s*((?:\d+:)?\d{1,2}:\d{2}(?:[.,]\d{1,3})?)\s*-->')
+SPEAKER_PATTERN = re.compile(r'^([^:\n]{1,60}):\s*(.*)$')
+# "er" is only a filler in lower case ("ER" and "Er" are words), and all-caps tokens are never fillers
+FILLER_PATTERN = re.compile(
+    r"(?<![\w'-])(?![A-Z]{2,}(?![\w'-]))(?:(?i:u+m+|u+h+|uhm|h+m+|mhm)|[Ee]e*r+m+|e+r+m*)(?![\w'-])[,.]?\s*"
+)
+WORD_PATTERN = re.compile(r"[\w']+")
+
+
+def parse_timestamp(timestamp):
+    parts = timestamp.replace(',', '.').split(':')
+    try:
+        seconds = float(parts[-1])
+        minutes = int(parts[-2]) if len(parts) > 1 else 0
+        hours = int(parts[-3]) if len(parts) > 2 else 0
+    except ValueError:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def strip_fillers(text):
+    text = FILLER_PATTERN.sub('', text)
+    text = re.sub(r'\s+([,.?!])', r'\1', text)
+    text = re.sub(r'^[,.]\s*', '', text.strip())
+    return re.sub(r'\s{2,}', ' ', text)
+
+
+def normalize_words(text):
+    return ' '.join(WORD_PATTERN.findall(strip_fillers(text).lower()))
+
+
+@dataclass
+class Cue:
+    start: Optional[float]
+    speaker: Optional[str]
+    text: str
+
+
+@dataclass
+class Turn:
+    start: Optional[float]
+    speaker: Optional[str]
+    text: str
+    timestamps: bool = True
+
+    def render(self):
+        prefix = ''
+        if self.timestamps and self.start is not None:
+            prefix = f"[{format_timestamp(self.start)}] "
+        if self.speaker:
+            prefix += f"{self.speaker}: "
+        return prefix + self.text
+
+
+@dataclass
+class CompactTranscript:
+    text: str
+    speakers: Dict[str, str]
+    cues: List[Cue] = field(default_factory=list)
+    turns: List[Turn] = field(default_factory=list)
+
+    def legend(self):
+        if not self.speakers:
+            return ''
+        return "Speakers: " + ", ".join(f"{alias} = {name}" for alias, name in self.speakers.items())
+
+    def excerpt(self, turn_indexes):
+        # Selected turns in conversation order; '...' marks skipped parts
+        lines = [self.legend()] if self.speakers else []
+        previous = None
+        for index in sorted(turn_indexes):
+            if previous is None and index > 0 or previous is not None and index > previous + 1:
+                lines.append('...')
+            lines.append(self.turns[index].render())
+            previous = index
+        if previous is not None and previous < len(self.turns) - 1:
+            lines.append('...')
+        return "\n\n".join(lines)
+
+    def resolve_timestamp(self, timestamp, quote):
+        # Maps an evidence quote back to the start of the original cue it came
+        # from. Turns carry one coarse timestamp, so the model's timestamp alone
+        # only points at the start of the turn.
+        wanted = normalize_words(quote or '')
+        if not wanted:
+            return timestamp
+        positions = []
+        parts = []
+        offset = 0
+        for cue in self.cues:
+            words = normalize_words(cue.text)
+            positions.append(offset)
+            parts.append(words)
+            offset += len(words) + 1
+        full_text = ' '.join(parts)
+
+        matches = self._find(full_text, wanted)
+        if not matches:
+            # Quotes are often trimmed or lightly paraphrased at the end
+            matches = self._find(full_text, ' '.join(wanted.split()[:8]))
+        if not matches:
+            return timestamp
+
+        starts = []
+        for match in matches:
+            index = max(i for i, position in enumerate(positions) if position <= match)
+            if self.cues[index].start is not None:
+                starts.append(self.cues[index].start)
+        if not starts:
+            return timestamp
+        hint = parse_timestamp(timestamp) if timestamp else None
+        if hint is not None:
+            starts.sort(key=lambda start: abs(start - hint))
+        return format_timestamp(starts[0])
+
+    def _find(self, text, words):
+        matches = []
+        start = text.find(words)
+        while start != -1 and words:
+            matches.append(start)
+            start = text.find(words, start + 1)
+        return matches
+
+
+# Rewrites a VTT transcript into a compact form for prompts: consecutive cues
+# from one speaker are merged into a single turn, speakers get short aliases,
+# each turn keeps only its start time (to the second) and filler words are
+# dropped. The original cues are kept so evidence can be mapped back to them.
+class TranscriptCompactor:
+    def __init__(self, speaker_aliases=True, strip_fillers=True, timestamps=True):
+        self.speaker_aliases = speaker_aliases
+        self.strip_fillers = strip_fillers
+        self.timestamps = timestamps
+
+    def settings(self):
+        return {
+            'speaker_aliases': self.speaker_aliases,
+            'strip_fillers': self.strip_fillers,
+            'timestamps': self.timestamps
+        }
+
+    def parse_cues(self, vtt_content):
+        cues = []
+        speaker = None
+        for block in re.split(r'\n\s*\n', vtt_content.replace('\r\n', '\n').strip()):
+            lines = [line.strip() for line in block.split('\n') if line.strip()]
+            if not lines or lines[0].startswith(('WEBVTT', 'NOTE', 'STYLE', 'REGION')):
+                continue
+            start = None
+            text_lines = []
+            for line in lines:
+                timing = TIMING_PATTERN.match(line)
+                if timing:
+                    start = parse_timestamp(timing.group(1))
+                elif start is None and line.isdigit():
+                    continue  # cue identifier
+                else:
+                    text_lines.append(line)
+            if not text_lines:
+                continue
+            text = ' '.join(text_lines)
+            match = SPEAKER_PATTERN.match(text)
+            if match and match.group(2):
+                speaker, text = match.group(1).strip(), match.group(2)
+            cues.append(Cue(start, speaker, text))
+        return cues
+
+    def compact(self, vtt_content, speaker_aliases=None):
+        speaker_aliases = self.speaker_aliases if speaker_aliases is None else speaker_aliases
+        cues = self.parse_cues(vtt_content)
+
+        turns = []
+        for cue in cues:
+            text = strip_fillers(cue.text) if self.strip_fillers else cue.text.strip()
+            if not text:
+                continue
+            if turns and turns[-1]['speaker'] == cue.speaker:
+                turns[-1]['texts'].append(text)
+            else:
+                turns.append({'speaker': cue.speaker, 'start': cue.start, 'texts': [text]})
+
+        aliases = {}
+        if speaker_aliases:
+            for turn in turns:
+                if turn['speaker'] and turn['speaker'] not in aliases:
+                    aliases[turn['speaker']] = f"S{len(aliases) + 1}"
+
+        compact_turns = [
+            Turn(turn['start'], aliases.get(turn['speaker'], turn['speaker']), ' '.join(turn['texts']), self.timestamps)
+            for turn in turns
+        ]
+        lines = []
+        if aliases:
+            lines.append("Speakers: " + ", ".join(f"{alias} = {name}" for name, alias in aliases.items()))
+            lines.append('')
+        for turn in compact_turns:
+            lines.append(turn.render())
+            lines.append('')
+
+        speakers = {alias: name for name, alias in aliases.items()}
+        return CompactTranscript("\n".join(lines).strip(), speakers, cues, compact_turns)
@@ -1,13 +1,38 @@
+import hashlib
+import json
+import logging
 import os
-from jinja2 import Environment, FileSystemLoader
+from functools import partial
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import Markup
 from datetime import datetime
-from plm.data_manager import DataManager
+from .fragment_cache import FragmentCache
+from .search_index import SearchIndexBuilder
 
+# Interview fields used by interview_fragment.html; a fragment is re-rendered
+# only when one of them (or the fragment template) changes.
+FRAGMENT_FIELDS = ('index', 'interviewee', 'interviewer', 'date', 'analysis_results')
+# Bump when fragment rendering changes outside the template (e.g. escaping)
+FRAGMENT_VERSION = 2
+SEARCH_INDEX_VERSION = 1
+
+# Reads project data through the application's DataManager, so reports match
+# the in-memory state the CLI shows without parsing the data file again
 class ReportingEngine:
-    def __init__(self):
+    def __init__(self, data_manager):
         self.template_dir = os.path.join(os.path.dirname(__file__), 'templates')
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
-        self.data_manager = DataManager(os.path.join('project_data', 'qr-ai-data.json'))
+        # Compiled templates are cached on disk so new processes skip compilation
+        bytecode_dir = os.path.join('project_data', 'template_cache')
+        os.makedirs(bytecode_dir, exist_ok=True)
+        self.env = Environment(
+            loader=FileSystemLoader(self.template_dir),
+            autoescape=select_autoescape(['html']),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_dir)
+        )
+        self.data_manager = data_manager
+        self.last_fragment_stats = {}
+        # Fragment keys from the last report of each project, used to key its search index
+        self._fragment_keys = {}
 
     def generate_webpage(self, project_name):
         # Load project data
@@ -16,30 +41,151 @@ class ReportingEngine:
         if not project_data:
             raise ValueError(f"Project '{project_name}' not found.")
 
+        output_dir = os.path.join('reports', project_name)
+        os.makedirs(output_dir, exist_ok=True)
+        interviews = project_data.get('interviews', [])
+
         # Prepare data for the template
         template_data = {
             'project_name': project_name,
             'principal_investigator': project_data.get('principal_investigator', 'Not specified'),
             'interviewers': self._get_unique_interviewers(project_data),
-            'interviews': project_data.get('interviews', []),
+            'interviews': interviews,
+            'interview_fragments': (Markup(load()) for _, _, load in self._fragment_entries(project_name, interviews)),
             'learning_goals': project_data.get('learning_goals', {}).get('preprocessed', []),
             'generated_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'meta_analysis': self.data_manager.get_meta_analysis_results(project_name)
         }
 
-        # Render the template
-        template = self.env.get_template('report_template.html')
-        output = template.render(template_data)
-
-        # Save the output
-        output_dir = os.path.join('reports', project_name)
-        os.makedirs(output_dir, exist_ok=True)
+        # Stream the page to disk; fragments are read one at a time while it renders
         output_file = os.path.join(output_dir, f'{project_name}_report.html')
-        with open(output_file, 'w') as f:
-            f.write(output)
+        self._write_file(output_file, self.env.get_template('report_template.html').generate(template_data))
+        self._write_search_index(output_dir, project_name, interviews, template_data['meta_analysis'])
 
         return output_file
 
+    def generate_paged_report(self, project_name):
+        # Small index page plus one script shard per interview, loaded by the page
+        # when the interview is opened, so the page size does not grow with the project
+        project_data = self.data_manager.get_project_status(project_name)
+
+        if not project_data:
+            raise ValueError(f"Project '{project_name}' not found.")
+
+        output_dir = os.path.join('reports', project_name, 'paged')
+        data_dir = os.path.join(output_dir, 'data')
+        os.makedirs(data_dir, exist_ok=True)
+        interviews = project_data.get('interviews', [])
+
+        manifest = {'interviews': [], 'shards': {}}
+        written = 0
+        for interview, key, load in self._fragment_entries(project_name, interviews):
+            # Shard names are content keys, so an existing shard is already up to date
+            shard = f"{key[:24]}.js"
+            shard_path = os.path.join(data_dir, shard)
+            if not os.path.exists(shard_path):
+                self._write_file(shard_path, f"window.qrReportShard({json.dumps(interview.get('index'))}, {json.dumps(load())});\n")
+                written += 1
+            manifest['interviews'].append({
+                'index': interview.get('index'),
+                'interviewee': interview.get('interviewee'),
+                'interviewer': interview.get('interviewer'),
+                'date': interview.get('date'),
+                'goals': len(interview.get('analysis_results') or [])
+            })
+            manifest['shards'][interview.get('index')] = shard
+        for name in set(os.listdir(data_dir)) - set(manifest['shards'].values()):
+            os.remove(os.path.join(data_dir, name))
+        self._write_file(os.path.join(output_dir, 'manifest.js'), f"window.qrReportManifest = {json.dumps(manifest)};\n")
+        meta_analysis = self.data_manager.get_meta_analysis_results(project_name)
+        self._write_search_index(output_dir, project_name, interviews, meta_analysis)
+
+        template_data = {
+            'project_name': project_name,
+            'principal_investigator': project_data.get('principal_investigator', 'Not specified'),
+            'interviewers': self._get_unique_interviewers(project_data),
+            'interview_count': len(interviews),
+            'learning_goals': project_data.get('learning_goals', {}).get('preprocessed', []),
+            'generated_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'meta_analysis': meta_analysis
+        }
+        output_file = os.path.join(output_dir, 'index.html')
+        self._write_file(output_file, self.env.get_template('paged_index.html').generate(template_data))
+        logging.info(f"Paged report: {written} of {len(interviews)} interview shard(s) written")
+        return output_file
+
+    def _write_search_index(self, output_dir, project_name, interviews, meta_analysis):
+        # Rebuilt only when an interview section or the meta-analysis changed; the
+        # fragment keys already cover everything the index is built from
+        entries = self._fragment_keys.get(project_name, {})
+        key = hashlib.sha256(json.dumps({
+            'version': SEARCH_INDEX_VERSION,
+            'fragments': [entries[interview.get('index')] for interview in interviews],
+            'meta_analysis': meta_analysis
+        }, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        path = os.path.join(output_dir, 'search.js')
+        header = f"// {key}\n"
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if f.readline() == header:
+                    return path
+        except FileNotFoundError:
+            pass
+
+        builder = SearchIndexBuilder()
+        for interview in interviews:
+            builder.add_results(interview.get('index'), interview.get('interviewee'), interview.get('analysis_results'))
+        builder.add_results(None, None, meta_analysis)
+        self._write_file(path, [header, 'window.qrReportSearch = ', json.dumps(builder.build(), separators=(',', ':')), ';\n'])
+        logging.info(f"Search index: {len(builder.docs)} entries, {len(builder.postings)} terms")
+        return path
+
+    def _write_file(self, path, chunks):
+        # Written next to the target and moved into place, so readers never see a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for chunk in ([chunks] if isinstance(chunks, str) else chunks):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def _fragment_entries(self, project_name, interviews):
+        # Yields (interview, key, load) per interview; load() returns the cached
+        # section HTML, rendering it only when its data changed. Nothing is loaded
+        # until asked for, so callers that already hold the output can skip it.
+        cache = FragmentCache(os.path.join('reports', project_name, '.fragments'))
+        template = self.env.get_template('interview_fragment.html')
+        template_hash = self._template_hash('interview_fragment.html')
+        entries = {}
+        stats = {'interviews': len(interviews), 'rendered': 0}
+
+        def load(interview, key):
+            fragment = cache.get(key)
+            if fragment is None:
+                fragment = template.render(interview=interview)
+                cache.set(key, fragment)
+                stats['rendered'] += 1
+            return fragment
+
+        for interview in interviews:
+            key = self._fragment_key(interview, template_hash)
+            entries[interview.get('index')] = key
+            yield interview, key, partial(load, interview, key)
+        cache.prune(entries.values())
+        self._fragment_keys[project_name] = entries
+        stats['reused'] = stats['interviews'] - stats['rendered']
+        self.last_fragment_stats = stats
+        logging.info(f"Report fragments: {stats['rendered']} rendered, {stats['reused']} reused")
+
+    def _fragment_key(self, interview, template_hash):
+        # Hashed from the data on every report, so an in-place edit is never served stale
+        payload = {field: interview.get(field) for field in FRAGMENT_FIELDS}
+        encoded = json.dumps({'version': FRAGMENT_VERSION, 'template': template_hash, 'interview': payload}, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def _template_hash(self, name):
+        source, _, _ = self.env.loader.get_source(self.env, name)
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
     def _get_unique_interviewers(self, project_data):
         interviewers = set()
         for interview in project_data.get('interviews', []):
@@ -0,0 +1,40 @@
+import os
+import threading
+
+
+# Rendered HTML fragments on disk, one file per content key. Keys are hashes
+# of everything a fragment depends on, so an entry never needs invalidating;
+# entries no longer referenced by the latest report are pruned.
+class FragmentCache:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.html")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, html):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+
+    def prune(self, keep_keys):
+        keep = {f"{key}.html" for key in keep_keys}
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
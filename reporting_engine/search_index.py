@@ -0,0 +1,59 @@
+import re
+from collections import defaultdict
+
+# Kept in step with the tokenizer in templates/search_box.html
+WORD_PATTERN = re.compile(r"[^\W_][\w'-]*")
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'its', 'of', 'on', 'or', 'that', 'the', 'their', 'they', 'this', 'to', 'was', 'were', 'with'
+))
+
+
+def tokenize(text):
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+# Inverted index over report answers and quotes, built once per report and
+# shipped to the browser. Each document is [interview, goal, evidence, snippet]
+# (interview is null for the meta-analysis, evidence 0 for an answer), and the
+# page derives links and labels from those numbers. Terms are sorted so the
+# page can prefix-match them with a binary search; postings are ascending
+# document ids stored as gaps to keep the file small.
+class SearchIndexBuilder:
+    def __init__(self, snippet_length=120):
+        self.snippet_length = snippet_length
+        self.docs = []
+        self.names = {}
+        self.postings = defaultdict(list)
+
+    def add(self, interview, goal, evidence, text):
+        text = ' '.join((text or '').split())
+        if not text:
+            return
+        doc_id = len(self.docs)
+        snippet = text if len(text) <= self.snippet_length else text[:self.snippet_length].rsplit(' ', 1)[0] + '...'
+        self.docs.append([interview, goal, evidence, snippet])
+        for term in set(tokenize(text)):
+            self.postings[term].append(doc_id)
+
+    def add_results(self, interview, name, results):
+        if interview is not None:
+            self.names[interview] = name
+        for goal, result in enumerate(results or [], 1):
+            self.add(interview, goal, 0, result.get('answer'))
+            for evidence, item in enumerate(result.get('evidence') or [], 1):
+                self.add(interview, goal, evidence, item.get('quote'))
+
+    def build(self):
+        terms = sorted(self.postings)
+        postings = []
+        for term in terms:
+            ids = self.postings[term]
+            postings.append([ids[0]] + [current - previous for previous, current in zip(ids, ids[1:])])
+        return {
+            'stopwords': sorted(STOPWORDS),
+            'names': self.names,
+            'docs': self.docs,
+            'terms': terms,
+            'postings': postings
+        }